@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Measures an interfaces_check.py sweep against mock_endpoints.py instead of real operators.
+
+For each size, starts the mock with that many interfaces, runs one full sweep
+in a fresh process (empty caches, no registry targets) and reports its wall
+time, HTTP requests per second and peak resident memory.
+
+Usage: python3 benchmark.py [--sizes 30,300,3000] [--latency 50] [--failure-rate 0.0] [--bundle-size 2097152]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+MOCK_PATH = os.path.join(SCRIPT_DIR, "mock_endpoints.py")
+DEFAULT_SIZES = [30, 300, 3000]
+MOCK_STARTUP_TIMEOUT_SECONDS = 30
+# Each interface exposes RPC, indexer and MASP endpoints
+SERVICES_PER_INTERFACE = 3
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def wait_for_mock(list_url, process):
+    deadline = time.monotonic() + MOCK_STARTUP_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"mock_endpoints.py exited with code {process.returncode}")
+        try:
+            with urllib.request.urlopen(list_url, timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"mock_endpoints.py did not answer on {list_url}")
+
+def run_sweep(list_url):
+    """Child process side: one sweep over the mock listing, returning its measurements."""
+    sys.path.insert(0, SCRIPT_DIR)
+    import interfaces_check
+    from probe_client import CircuitBreaker, ConditionalCache
+    interfaces_check.INTERFACES = {"namada": {"interface": list_url}}
+    interfaces_check.REGISTRY_SOURCES = {}
+    breaker = CircuitBreaker({}, interfaces_check.CIRCUIT_BREAKER_THRESHOLD, interfaces_check.CIRCUIT_BREAKER_PROBE_POLICY)
+    version_cache = interfaces_check.BundleVersionCache({})
+    http_cache = ConditionalCache({})
+    started = time.perf_counter()
+    output_data = asyncio.run(interfaces_check.check_once(breaker, version_cache, http_cache, interfaces_check.load_registry()))
+    wall = time.perf_counter() - started
+    interfaces = output_data["networks"][0]["interface"] if output_data["networks"] else []
+    return {
+        "wall_seconds": wall,
+        "requests": output_data["run_stats"]["http_pool"]["requests"],
+        "interfaces_up": sum(1 for interface in interfaces if interface["status"] == "up"),
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    }
+
+def benchmark(size, args):
+    port = free_port()
+    mock = subprocess.Popen(
+        [sys.executable, MOCK_PATH, "--interfaces", str(size), "--port", str(port), "--latency", str(args.latency),
+         "--jitter", str(args.jitter), "--failure-rate", str(args.failure_rate), "--bundle-size", str(args.bundle_size)],
+        stdout=subprocess.DEVNULL
+    )
+    try:
+        list_url = f"http://127.0.0.1:{port}/interfaces.json"
+        wait_for_mock(list_url, mock)
+        # A separate process per sweep, so peak RSS is not carried over from smaller runs
+        sweep = subprocess.run([sys.executable, os.path.abspath(__file__), "--sweep", list_url], capture_output=True, text=True)
+        if sweep.returncode != 0:
+            raise RuntimeError(f"sweep failed:\n{sweep.stderr}")
+        result = json.loads(sweep.stdout.strip().splitlines()[-1])
+    finally:
+        mock.terminate()
+        mock.wait()
+    result["interfaces"] = size
+    result["endpoints"] = size * SERVICES_PER_INTERFACE
+    return result
+
+def print_table(results):
+    print(f"{'interfaces':>10} {'endpoints':>9} {'up':>6} {'wall s':>8} {'requests':>9} {'req/s':>8} {'peak RSS MB':>12}")
+    for r in results:
+        rate = r["requests"] / r["wall_seconds"] if r["wall_seconds"] else 0.0
+        print(f"{r['interfaces']:>10} {r['endpoints']:>9} {r['interfaces_up']:>6} {r['wall_seconds']:>8.2f} {r['requests']:>9} {rate:>8.1f} {r['peak_rss_kb'] / 1024:>12.1f}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark an interfaces_check.py sweep against simulated endpoints.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="comma-separated interface counts")
+    parser.add_argument("--latency", type=float, default=50, help="mock response delay in milliseconds")
+    parser.add_argument("--jitter", type=float, default=10, help="mock delay variation in milliseconds")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of mock requests answered with 503")
+    parser.add_argument("--bundle-size", type=int, default=2 * 1024 * 1024, help="mock JS bundle size in bytes")
+    parser.add_argument("--sweep", metavar="LIST_URL", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.sweep:
+        # Only the JSON result line may reach stdout
+        sys.stdout, real_stdout = sys.stderr, sys.stdout
+        try:
+            result = run_sweep(args.sweep)
+        finally:
+            sys.stdout = real_stdout
+        print(json.dumps(result))
+        return
+    results = []
+    for size in [int(s) for s in args.sizes.split(",") if s.strip()]:
+        print(f"Sweeping {size} interfaces...", flush=True)
+        results.append(benchmark(size, args))
+    print_table(results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Append-only JSON Lines storage for the interface change history.
+
+Each change record is one line of changes.jsonl. A run appends only its own
+records and fsyncs them, so its write cost no longer grows with the history.
+The legacy changes.json (a single JSON array rewritten on every run) can
+still be read, and is converted once into the log, either by the tracker on
+its first run or by hand:
+
+    python3 change_log.py convert
+
+Per-team histories work the same way: team-data/json/<team>.json is a
+compacted, indented view and new entries are appended to <team>.jsonl next
+to it. Readers see the view followed by the pending entries. Compacting
+folds the pending entries into the view; run it while no tracker is writing:
+
+    python3 change_log.py compact [team ...]
+"""
+
+import json
+import os
+import re
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+# POSIX paths for GitHub Actions/Ubuntu
+BASE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHANGES_LOG_PATH = os.path.join(BASE_PATH, "changes.jsonl")
+LEGACY_CHANGES_PATH = os.path.join(BASE_PATH, "changes.json")
+TEAM_JSON_PATH = os.path.join(BASE_PATH, "team-data", "json")
+
+READ_CHUNK_SIZE = 1024 * 1024
+# How far back a torn last line is searched for in one read
+TAIL_SCAN_SIZE = 64 * 1024
+# Characters that can continue a JSON number decoded from a partial buffer
+NUMBER_TAIL = re.compile(r"[0-9+\-.eE]*")
+
+def encode_record(record: Dict[str, Any]) -> bytes:
+    return (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+
+def repair_tail(path: str) -> int:
+    """Cut off a partial last line left by an interrupted append; returns the log size."""
+    try:
+        f = open(path, "r+b")
+    except FileNotFoundError:
+        return 0
+    with f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return 0
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return size
+        end = 0
+        pos = size
+        while pos > 0:
+            step = min(TAIL_SCAN_SIZE, pos)
+            pos -= step
+            f.seek(pos)
+            newline = f.read(step).rfind(b"\n")
+            if newline >= 0:
+                end = pos + newline + 1
+                break
+        print("Warning: dropping {} bytes of an incomplete record at the end of {}".format(size - end, path))
+        f.truncate(end)
+        f.flush()
+        os.fsync(f.fileno())
+        return end
+
+def append_records(records: Iterable[Dict[str, Any]], path: str) -> int:
+    """Append records to the log and fsync them; returns the log size afterwards."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    repair_tail(path)
+    with open(path, "ab") as f:
+        f.write(b"".join(encode_record(record) for record in records))
+        f.flush()
+        os.fsync(f.fileno())
+        return f.tell()
+
+class _Position:
+    """Where in the file the streaming buffer starts, so errors can point into the file."""
+
+    def __init__(self):
+        self.char = 0
+        self.line = 1
+        self.column = 1
+
+    def advance(self, text: str) -> None:
+        self.char += len(text)
+        newlines = text.count("\n")
+        if newlines:
+            self.line += newlines
+            self.column = len(text) - text.rfind("\n")
+        else:
+            self.column += len(text)
+
+    def describe(self, buffer: str, pos: int) -> str:
+        line = self.line + buffer.count("\n", 0, pos)
+        line_start = buffer.rfind("\n", 0, pos) + 1
+        column = pos - line_start + (self.column if line_start == 0 else 1)
+        return "line {} column {} (char {})".format(line, column, self.char + pos)
+
+def iter_json_array(f: TextIO, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Any]:
+    """Yield the elements of a top-level JSON array one by one, holding only about one element in memory.
+
+    A malformed file raises ValueError once the elements before the fault have
+    been yielded; callers that must not act on part of a file collect it first.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+    opened = False
+    start = _Position()
+    while True:
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+        if pos == len(buffer):
+            if eof:
+                raise ValueError("unterminated JSON array: {}".format(start.describe(buffer, pos)))
+            chunk = f.read(chunk_size)
+            start.advance(buffer[:pos])
+            buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+            continue
+        if not opened:
+            if buffer[pos] != "[":
+                raise ValueError("expected a JSON array: {}".format(start.describe(buffer, pos)))
+            opened = True
+            pos += 1
+            continue
+        if buffer[pos] == "]":
+            return
+        try:
+            element, end = decoder.raw_decode(buffer, pos)
+            # A number running up to the end of the buffer, like "12" or "1.5e", may go on in the next chunk
+            complete = eof or not isinstance(element, (int, float)) or NUMBER_TAIL.match(buffer, end).end() < len(buffer)
+        except json.JSONDecodeError as e:
+            if eof:
+                # e's position is within the buffer, not the file
+                raise ValueError("{}: {}".format(e.msg, start.describe(buffer, e.pos))) from None
+            complete = False
+        if not complete:
+            # The element continues past the buffer
+            chunk = f.read(chunk_size)
+            start.advance(buffer[:pos])
+            buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+            continue
+        pos = end
+        yield element
+
+def iter_json_lines(f, path: str) -> Iterator[Dict[str, Any]]:
+    for number, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            # Normally an append that was cut short; it is dropped on the next append
+            print("Warning: skipping unreadable line {} of {}: {}".format(number, path, e))
+
+def iter_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Stream the records of a change history in either format, decided by its first character."""
+    with open(path, "r", encoding="utf-8") as f:
+        first = ""
+        while True:
+            char = f.read(1)
+            if not char or not char.isspace():
+                first = char
+                break
+        f.seek(0)
+        if first == "[":
+            for record in iter_json_array(f):
+                yield record
+        else:
+            for record in iter_json_lines(f, path):
+                yield record
+
+def is_record_boundary(path: str, offset: int) -> bool:
+    """Whether offset is the start of a line of the log, i.e. a usable resume position."""
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return False
+    if offset < 0 or offset > size:
+        return False
+    if offset == 0:
+        return True
+    with open(path, "rb") as f:
+        f.seek(offset - 1)
+        return f.read(1) == b"\n"
+
+def iter_records_from(path: str, offset: int = 0) -> Iterator[Tuple[Dict[str, Any], int]]:
+    """Yield (record, offset after it) for the log's complete lines starting at byte offset.
+
+    A last line without its newline is still being written or was cut short,
+    so it is left for a later read instead of being consumed.
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                return
+            offset += len(line)
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line.decode("utf-8"))
+            except ValueError as e:
+                print("Warning: skipping unreadable record ending at byte {} of {}: {}".format(offset, path, e))
+                continue
+            yield record, offset
+
+def history_path(log_path: str, legacy_path: str) -> Optional[str]:
+    """The file holding the change history: the log once it exists, the legacy array before that."""
+    if os.path.exists(log_path):
+        return log_path
+    if os.path.exists(legacy_path):
+        return legacy_path
+    return None
+
+def iter_changes(log_path: str, legacy_path: str) -> Iterator[Dict[str, Any]]:
+    path = history_path(log_path, legacy_path)
+    if path is None:
+        print("Error loading change history: neither {} nor {} exists".format(log_path, legacy_path))
+        return iter(())
+    return iter_records(path)
+
+def convert_legacy(legacy_path: str, log_path: str) -> int:
+    """Rewrite a legacy changes.json as a JSON Lines log and remove it; returns the records converted.
+
+    The log is built under a temporary name and only moved into place once
+    it is complete, so an interrupted conversion can simply be run again.
+    """
+    if os.path.exists(log_path):
+        raise FileExistsError("{} already exists, not converting {} again".format(log_path, legacy_path))
+    temp_path = log_path + ".tmp"
+    count = 0
+    with open(temp_path, "wb") as out:
+        for record in iter_records(legacy_path):
+            out.write(encode_record(record))
+            count += 1
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(temp_path, log_path)
+    os.remove(legacy_path)
+    return count
+
+def ensure_log(log_path: str, legacy_path: str) -> None:
+    """Convert the legacy history the first time the log is written to."""
+    if os.path.exists(log_path) or not os.path.exists(legacy_path):
+        return
+    count = convert_legacy(legacy_path, log_path)
+    print("Converted {} records from {} to {}".format(count, legacy_path, log_path))
+
+def team_log_path(json_path: str) -> str:
+    return os.path.splitext(json_path)[0] + ".jsonl"
+
+def append_team_entries(entries: Iterable[Dict[str, Any]], json_path: str) -> int:
+    """Append entries to a team's pending log instead of rewriting its JSON view."""
+    return append_records(entries, team_log_path(json_path))
+
+def iter_team_entries(json_path: str) -> Iterator[Dict[str, Any]]:
+    """A team's full history: the entries of its JSON view, then its pending ones.
+
+    A view that cannot be parsed raises ValueError partway through, after the
+    entries before the fault; callers should read it all before using any.
+    """
+    if os.path.exists(json_path):
+        for entry in iter_records(json_path):
+            yield entry
+    log_path = team_log_path(json_path)
+    if os.path.exists(log_path):
+        for entry in iter_records(log_path):
+            yield entry
+
+def team_files(json_dir: str) -> List[str]:
+    """JSON view paths of every team with a view, pending entries or both."""
+    if not os.path.isdir(json_dir):
+        return []
+    names = set()
+    for filename in os.listdir(json_dir):
+        stem, ext = os.path.splitext(filename)
+        if ext in (".json", ".jsonl") and stem != "summary":
+            names.add(stem)
+    return [os.path.join(json_dir, name + ".json") for name in sorted(names)]
+
+def compact_team(json_path: str) -> int:
+    """Fold a team's pending entries into its JSON view; returns how many were folded in.
+
+    The view is replaced atomically before the pending log is removed. If a
+    previous compaction stopped in between, the view already ends with the
+    pending entries and they are only removed.
+    """
+    log_path = team_log_path(json_path)
+    if not os.path.exists(log_path):
+        return 0
+    pending = list(iter_records(log_path))
+    entries = []
+    if os.path.exists(json_path):
+        entries = list(iter_records(json_path))
+    if not pending or entries[-len(pending):] == pending:
+        os.remove(log_path)
+        return 0
+    entries.extend(pending)
+    temp_path = json_path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(entries, f, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, json_path)
+    os.remove(log_path)
+    return len(pending)
+
+def compact_teams(json_dir: str, teams: Optional[List[str]] = None) -> None:
+    paths = team_files(json_dir)
+    if teams:
+        wanted = set(teams)
+        paths = [path for path in paths if os.path.splitext(os.path.basename(path))[0] in wanted]
+    compacted = 0
+    failed = 0
+    for path in paths:
+        try:
+            folded = compact_team(path)
+        except ValueError as e:
+            # A corrupt view is left as it is, with its pending log, and the other teams still get compacted
+            print("Error compacting {}: {}".format(path, e))
+            failed += 1
+            continue
+        if folded:
+            compacted += 1
+            print("Compacted {}: {} pending entries".format(path, folded))
+    print("Compacted {} of {} team files{}".format(compacted, len(paths), ", {} failed".format(failed) if failed else ""))
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command == "compact":
+        compact_teams(TEAM_JSON_PATH, sys.argv[2:])
+        return
+    if command != "convert" or len(sys.argv) > 2:
+        print("Usage: python3 change_log.py convert | compact [team ...]")
+        sys.exit(2)
+    if not os.path.exists(LEGACY_CHANGES_PATH):
+        print("Nothing to convert: {} does not exist".format(LEGACY_CHANGES_PATH))
+        return
+    if os.path.exists(CHANGES_LOG_PATH):
+        print("Nothing to convert: {} already exists".format(CHANGES_LOG_PATH))
+        return
+    ensure_log(CHANGES_LOG_PATH, LEGACY_CHANGES_PATH)
+
+if __name__ == "__main__":
+    main()
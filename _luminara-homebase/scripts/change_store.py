@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+SQLite storage for interface_changes rows, replacing the append-only .sql text dumps.
+
+interfaces_tracker.py writes to changes.db and team_interfaces_tracker.py to
+team-data/changes.db. Rows carry the same columns the INSERT statements
+used to, with old_value and new_value JSON-encoded. Each run's rows go in as
+one batched transaction. The database runs in WAL mode and is checkpointed
+on close, so the committed .db file is always complete on its own. Lookups
+by team, service, field and time use the
+(team, service, field, timestamp) index.
+
+The history that predates the database lives in the .sql dumps (changes.sql,
+team-data/sql/*.sql). The trackers open their store with those dumps, and
+the first open imports them; imported_sources records what was imported, so
+later opens and dumps written afterwards are not imported again.
+parse_teams.py rebuilds the team database from the full change log instead.
+
+Dumps can also be imported by hand, and .sql text can still be
+produced on demand, as multi-row INSERTs or a PostgreSQL COPY block (see
+sql_export.py):
+
+    python3 change_store.py import <database> <file.sql> [...]
+    python3 change_store.py export <database> <file.sql> [--team TEAM] [--format insert|copy]
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import sql_export
+
+# POSIX paths for GitHub Actions/Ubuntu
+BASE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHANGES_DB_PATH = os.path.join(BASE_PATH, "changes.db")
+TEAM_CHANGES_DB_PATH = os.path.join(BASE_PATH, "team-data", "changes.db")
+
+COLUMNS = ("timestamp", "team", "service", "field", "full_path", "change_type", "old_value", "new_value")
+# Rows per executemany call when importing large dumps
+IMPORT_BATCH_SIZE = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS interface_changes (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    team TEXT,
+    service TEXT,
+    field TEXT,
+    full_path TEXT,
+    change_type TEXT NOT NULL,
+    old_value TEXT,
+    new_value TEXT
+);
+CREATE INDEX IF NOT EXISTS interface_changes_team_service_field_timestamp
+    ON interface_changes (team, service, field, timestamp);
+CREATE INDEX IF NOT EXISTS interface_changes_timestamp ON interface_changes (timestamp);
+CREATE TABLE IF NOT EXISTS imported_sources (
+    source TEXT PRIMARY KEY,
+    rows INTEGER NOT NULL,
+    imported_at TEXT NOT NULL
+);
+"""
+
+# Text of an unescaped legacy value: anything up to the "');" that closes its own statement
+_LEGACY_VALUE = r"(?:(?!'\);).)*"
+# One statement as written by the trackers; the JSON values are matched up to the
+# next "', '" separator, which is as much as the unescaped legacy format allows
+LEGACY_INSERT_PATTERN = re.compile(
+    r"^INSERT INTO interface_changes \(timestamp, team, service, field, full_path, change_type, old_value, new_value\) "
+    r"VALUES \('(?P<timestamp>[^']*)', (?P<team>null|'" + _LEGACY_VALUE + r"?'), (?P<service>null|'[^']*'), "
+    r"'(?P<field>[^']*)', '(?P<full_path>" + _LEGACY_VALUE + r"?)', '(?P<change_type>added|removed|modified|initial)', "
+    r"'(?P<old_value>" + _LEGACY_VALUE + r"?)', '(?P<new_value>" + _LEGACY_VALUE + r")'\);?\s*$"
+)
+# parse_teams.py wrote its dumps without a final newline, so the tracker's next
+# append continued the last line: "...');INSERT INTO ..." holds two statements
+STATEMENT_BOUNDARY = re.compile(r"(?<=\);)(?=INSERT INTO |BEGIN;)")
+
+Row = Tuple[Any, ...]
+
+def change_row(change: Dict[str, Any], timestamp: str) -> Row:
+    return (
+        timestamp,
+        change.get("team"),
+        change.get("service"),
+        change.get("field"),
+        change.get("full_path"),
+        change.get("type"),
+        json.dumps(change.get("old_value")),
+        json.dumps(change.get("new_value"))
+    )
+
+def initial_row(timestamp: str, state: Any, team: Optional[str] = None, service: Optional[str] = None,
+                field: str = "root", full_path: str = "root") -> Row:
+    return (timestamp, team, service, field, full_path, "initial", "null", json.dumps(state))
+
+def source_name(path: str) -> str:
+    # Relative to the data directory, so the record holds across checkouts
+    return os.path.relpath(os.path.abspath(path), BASE_PATH)
+
+def log_rows(records: Iterable[Dict[str, Any]], skip_team: Optional[str] = None) -> Iterator[Row]:
+    """The rows interfaces_tracker.py writes for each change log record."""
+    for record in records:
+        if record.get("type") == "initial":
+            yield initial_row(record["timestamp"], record.get("state"))
+            continue
+        for change in record.get("changes", []):
+            if skip_team is None or change.get("team") != skip_team:
+                yield change_row(change, record["timestamp"])
+
+class ChangeStore:
+    def __init__(self, path: str, legacy_dumps: Optional[str] = None):
+        """Open or create the database at path; legacy_dumps is a .sql dump, or a directory of them, to import once."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        # WAL keeps committed transactions consistent at NORMAL; only the last one may be lost on power failure
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        if legacy_dumps is not None:
+            self.import_legacy_dumps(legacy_dumps)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self) -> None:
+        # Fold the WAL back into the database file so the .db is complete on its own
+        self.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.connection.close()
+
+    def insert(self, rows: Iterable[Row]) -> int:
+        """Insert rows in a single transaction; returns how many were inserted."""
+        rows = list(rows)
+        with self.connection:
+            return self.insert_batch(rows)
+
+    def history(self, team: Optional[str] = None, service: Optional[str] = None, field: Optional[str] = None,
+                since: Optional[str] = None, until: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Rows matching the given filters, oldest first."""
+        conditions = []
+        params = []  # type: List[Any]
+        for column, value in (("team", team), ("service", service), ("field", field)):
+            if value is not None:
+                conditions.append("{} = ?".format(column))
+                params.append(value)
+        if since is not None:
+            conditions.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("timestamp < ?")
+            params.append(until)
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        cursor = self.connection.execute(
+            "SELECT {} FROM interface_changes{} ORDER BY timestamp, id".format(", ".join(COLUMNS), where),
+            params
+        )
+        return [dict(zip(COLUMNS, row)) for row in cursor]
+
+    def rows(self, team: Optional[str] = None) -> Iterator[Row]:
+        """Every row in insertion order, optionally for one team only."""
+        query = "SELECT {} FROM interface_changes".format(", ".join(COLUMNS))
+        if team is not None:
+            return self.connection.execute(query + " WHERE team = ? ORDER BY id", (team,))
+        return self.connection.execute(query + " ORDER BY id")
+
+    def is_imported(self, source: str) -> bool:
+        return self.connection.execute("SELECT 1 FROM imported_sources WHERE source = ?", (source,)).fetchone() is not None
+
+    def record_source(self, source: str, rows: int) -> None:
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR IGNORE INTO imported_sources (source, rows, imported_at) VALUES (?, ?, ?)",
+                (source, rows, datetime.now(timezone.utc).isoformat() + "Z")
+            )
+
+    def import_legacy_dumps(self, dumps_path: str) -> int:
+        """Import a dump, or every dump in a directory, unless done before; returns the rows imported.
+
+        The source is recorded even when there is nothing to import yet, so
+        dumps only written later, alongside this store, are never imported.
+        """
+        source = source_name(dumps_path)
+        if self.is_imported(source):
+            return 0
+        if os.path.isdir(dumps_path):
+            paths = [os.path.join(dumps_path, name) for name in sorted(os.listdir(dumps_path)) if name.endswith(".sql")]
+        else:
+            paths = [dumps_path] if os.path.exists(dumps_path) else []
+        imported = 0
+        for sql_path in paths:
+            # A directory import that was interrupted resumes after the files already done
+            if self.is_imported(source_name(sql_path)):
+                continue
+            rows, skipped = self.import_sql_file(sql_path)
+            imported += rows
+            print("Imported {} rows from {}{}".format(rows, sql_path, ", {} statements skipped".format(skipped) if skipped else ""))
+        self.record_source(source, imported)
+        return imported
+
+    def import_sql_file(self, sql_path: str) -> Tuple[int, int]:
+        """Load a .sql dump once; returns (rows imported, statements that could not be parsed).
+
+        Understands the single-row statements the trackers used to write,
+        which are parsed since their values were never escaped, and the
+        multi-row INSERT transactions of sql_export, which are executed as is.
+        """
+        source = source_name(sql_path)
+        if self.is_imported(source):
+            print("Skipping {}: already imported".format(sql_path))
+            return 0, 0
+        imported = 0
+        skipped = 0
+        batch = []  # type: List[Row]
+        with self.connection:
+            for number, statement in enumerate(iter_sql_statements(sql_path), 1):
+                row = parse_legacy_insert(statement)
+                if row is None and is_multi_row_insert(statement):
+                    # Keep the file's order: rows parsed so far go in first
+                    imported += self.insert_batch(batch)
+                    batch = []
+                    imported += self.connection.execute(statement).rowcount
+                    continue
+                if row is None:
+                    print("Warning: could not parse statement {} of {}: {}".format(number, sql_path, statement[:200].strip()))
+                    skipped += 1
+                    continue
+                batch.append(row)
+                if len(batch) >= IMPORT_BATCH_SIZE:
+                    imported += self.insert_batch(batch)
+                    batch = []
+            imported += self.insert_batch(batch)
+            self.connection.execute(
+                "INSERT INTO imported_sources (source, rows, imported_at) VALUES (?, ?, ?)",
+                (source, imported, datetime.now(timezone.utc).isoformat() + "Z")
+            )
+        return imported, skipped
+
+    def insert_batch(self, rows: List[Row]) -> int:
+        # Inside the caller's transaction
+        self.connection.executemany(
+            "INSERT INTO interface_changes ({}) VALUES ({})".format(", ".join(COLUMNS), ", ".join("?" * len(COLUMNS))),
+            rows
+        )
+        return len(rows)
+
+def rebuild_team_store(records: Iterable[Dict[str, Any]], target_path: str, legacy_dumps: str) -> int:
+    """Replace the team database with the rows of the full change log except team "-"; returns the rows written.
+
+    The log holds everything the legacy team dumps were split from, so they
+    are recorded as covered instead of being imported on top.
+    """
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(target_path + suffix):
+            os.remove(target_path + suffix)
+    with ChangeStore(target_path) as store:
+        count = store.insert(log_rows(records, skip_team="-"))
+        store.record_source(source_name(legacy_dumps), 0)
+        return count
+
+def iter_sql_statements(sql_path: str) -> Iterator[str]:
+    """INSERT statements of a dump; neither format has line breaks inside a value.
+
+    A statement ends with the line, or the part of a line, that ends in ";".
+    The BEGIN/COMMIT lines around sql_export batches are left out.
+    """
+    pending = ""
+    with open(sql_path, "r", encoding="utf-8") as f:
+        for line in f:
+            for part in STATEMENT_BOUNDARY.split(line.strip()):
+                if not part:
+                    continue
+                if part in ("BEGIN;", "COMMIT;"):
+                    if pending:
+                        yield pending
+                        pending = ""
+                    continue
+                pending += part + "\n"
+                if part.endswith(";"):
+                    yield pending
+                    pending = ""
+    # An unterminated statement is still returned, to be reported as unparseable
+    if pending:
+        yield pending
+
+def is_multi_row_insert(statement: str) -> bool:
+    return statement.startswith("INSERT INTO interface_changes ({}) VALUES\n".format(", ".join(COLUMNS)))
+
+def sql_text(value: Optional[str]) -> Optional[str]:
+    return None if value == "null" else value[1:-1]
+
+def parse_legacy_insert(statement: str) -> Optional[Row]:
+    match = LEGACY_INSERT_PATTERN.match(statement.strip())
+    if not match:
+        return None
+    return (
+        match.group("timestamp"),
+        sql_text(match.group("team")),
+        sql_text(match.group("service")),
+        match.group("field"),
+        match.group("full_path"),
+        match.group("change_type"),
+        match.group("old_value"),
+        match.group("new_value")
+    )
+
+def export_sql(store: ChangeStore, sql_path: str, team: Optional[str] = None, sql_format: str = "insert") -> int:
+    """Write the rows to a .sql file in one transaction; returns how many were written."""
+    with open(sql_path, "w", encoding="utf-8") as f:
+        return sql_export.write_rows(store.rows(team), f, COLUMNS, sql_format)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Import .sql dumps into an interface_changes database, or export one.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_parser = commands.add_parser("import", help="load .sql dumps, each only once")
+    import_parser.add_argument("database")
+    import_parser.add_argument("sql_files", nargs="+")
+    export_parser = commands.add_parser("export", help="write the rows as SQL")
+    export_parser.add_argument("database")
+    export_parser.add_argument("sql_file")
+    export_parser.add_argument("--team", help="only this team's rows")
+    export_parser.add_argument("--format", choices=sql_export.FORMATS, default="insert",
+                               help="multi-row INSERTs for any database, or a PostgreSQL COPY block")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    with ChangeStore(args.database) as store:
+        if args.command == "import":
+            for sql_path in args.sql_files:
+                imported, skipped = store.import_sql_file(sql_path)
+                print("Imported {} rows from {}{}".format(imported, sql_path, ", {} statements skipped".format(skipped) if skipped else ""))
+        else:
+            count = export_sql(store, args.sql_file, args.team, args.format)
+            print("Exported {} rows to {}".format(count, args.sql_file))
+
+if __name__ == "__main__":
+    main()
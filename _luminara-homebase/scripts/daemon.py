@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Long-running replacement for the check, tracker and team tracker cron jobs.
+
+Runs interfaces_check -> interfaces_tracker -> team_interfaces_tracker -> json_to_csv
+in one process every TICK_INTERVAL_SECONDS. Tracker states, caches and the HTTP
+pool stay in memory between ticks; state files are only rewritten when their
+content changes, and CSVs are only regenerated for teams whose logs grew.
+Service endpoints are probed on their own schedule (see probe_scheduler.py),
+while every tick still writes a complete interface-status.json.
+
+services_health_config.json and the registry files are watched between ticks.
+A config change re-judges the last snapshot straight away without probing;
+registry changes are picked up by the next tick. The remote interface lists
+are revalidated with conditional GETs on every tick anyway.
+
+Usage: python3 daemon.py [interval_seconds]
+"""
+
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+from datetime import datetime, timezone
+
+import interfaces_check
+import interfaces_tracker
+import json_to_csv
+import run_report
+import team_interfaces_tracker
+from probe_client import CircuitBreaker, ConditionalCache
+from probe_scheduler import ProbeScheduler
+
+TICK_INTERVAL_SECONDS = 60
+# Resolved addresses are refreshed this often, since the pool now outlives a single sweep
+DNS_CACHE_TTL_SECONDS = 300
+# Flapping and lagging endpoints are probed every tick, stable ones back off up to this
+MAX_PROBE_INTERVAL_SECONDS = 15 * 60
+# How often watched local files are checked for changes between ticks
+WATCH_INTERVAL_SECONDS = 5
+
+class StateWriter:
+    """Writes JSON files only when their serialized content differs from the last write."""
+
+    def __init__(self):
+        self.written = {}
+
+    def flush(self, data, path):
+        content = json.dumps(data, indent=4)
+        if self.written.get(path) == content:
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        self.written[path] = content
+        return True
+
+class FileWatcher:
+    """Reports when the modification time of any watched file changes, appears or disappears."""
+
+    def __init__(self, paths):
+        self.paths = list(paths)
+        self.mtimes = self.snapshot()
+
+    def snapshot(self):
+        mtimes = {}
+        for path in self.paths:
+            try:
+                mtimes[path] = os.stat(path).st_mtime_ns
+            except OSError:
+                mtimes[path] = None
+        return mtimes
+
+    def changed(self):
+        mtimes = self.snapshot()
+        if mtimes == self.mtimes:
+            return False
+        self.mtimes = mtimes
+        return True
+
+def registry_paths():
+    return [
+        os.path.join(path, filename)
+        for path in interfaces_check.REGISTRY_SOURCES.values()
+        for filename in interfaces_check.REGISTRY_FILES
+    ]
+
+class Daemon:
+    def __init__(self, interval):
+        self.interval = interval
+        self.writer = StateWriter()
+        self.breaker_history = interfaces_check.load_state(interfaces_check.CIRCUIT_BREAKER_PATH)
+        self.version_cache = interfaces_check.BundleVersionCache(interfaces_check.load_state(interfaces_check.VERSION_CACHE_PATH))
+        self.http_cache_entries = interfaces_check.load_state(interfaces_check.HTTP_CACHE_PATH)
+        self.registry = interfaces_check.load_registry()
+        self.scheduler = ProbeScheduler(interval, max(interval, MAX_PROBE_INTERVAL_SECONDS))
+        tracked = interfaces_tracker.TRACKED_NETWORKS
+        self.tracker_state = interfaces_tracker.filter_networks(interfaces_tracker.load_json_file(interfaces_tracker.STATE_PATH), tracked)
+        self.latency_stats = interfaces_tracker.load_json_file(interfaces_tracker.LATENCY_STATS_PATH)
+        team_tracked = team_interfaces_tracker.TRACKED_NETWORKS
+        self.team_state = team_interfaces_tracker.filter_networks(team_interfaces_tracker.load_json_file(team_interfaces_tracker.STATE_PATH), team_tracked)
+        self.config_watcher = FileWatcher([interfaces_check.CONFIG_PATH])
+        self.registry_watcher = FileWatcher(registry_paths())
+        self.last_output = None
+        self.stopping = asyncio.Event()
+
+    async def check(self, client):
+        # Fresh per-run counters over the long-lived histories and cache entries
+        breaker = CircuitBreaker(self.breaker_history, interfaces_check.CIRCUIT_BREAKER_THRESHOLD, interfaces_check.CIRCUIT_BREAKER_PROBE_POLICY)
+        http_cache = ConditionalCache(self.http_cache_entries)
+        self.version_cache = interfaces_check.BundleVersionCache(self.version_cache.entries)
+        client.breaker = breaker
+        client.http_cache = http_cache
+        output_data = await interfaces_check.run_check(client, breaker, self.version_cache, http_cache, self.registry, self.scheduler)
+        self.breaker_history = breaker.history
+        self.http_cache_entries = http_cache.entries
+        self.writer.flush(breaker.history, interfaces_check.CIRCUIT_BREAKER_PATH)
+        self.writer.flush(self.version_cache.entries, interfaces_check.VERSION_CACHE_PATH)
+        self.writer.flush(http_cache.snapshot(), interfaces_check.HTTP_CACHE_PATH)
+        interfaces_check.print_summary(output_data["run_stats"])
+        scheduler_stats = output_data["run_stats"]["scheduler"]
+        print(f"Scheduler: {scheduler_stats['probed']} endpoints probed, {scheduler_stats['served_from_cache']} served from earlier probes")
+        interfaces_check.write_output(output_data)
+        self.last_output = output_data
+        return output_data
+
+    def track(self, output_data, sample_latency=True):
+        # Round-trip through JSON so the trackers see exactly what they would read from interface-status.json
+        snapshot = json.loads(json.dumps(output_data))
+        timestamp = datetime.now(timezone.utc).isoformat() + "Z"
+        current_state = interfaces_tracker.filter_networks(snapshot, interfaces_tracker.TRACKED_NETWORKS)
+        if interfaces_tracker.record_changes(current_state, self.tracker_state, timestamp):
+            self.writer.flush(current_state, interfaces_tracker.STATE_PATH)
+        self.tracker_state = current_state
+        if sample_latency:
+            self.latency_stats = interfaces_tracker.update_latency_stats(current_state, self.latency_stats)
+            self.writer.flush(self.latency_stats, interfaces_tracker.LATENCY_STATS_PATH)
+
+        team_state = team_interfaces_tracker.filter_networks(snapshot, team_interfaces_tracker.TRACKED_NETWORKS)
+        updated_files = team_interfaces_tracker.record_team_changes(team_state, self.team_state, timestamp)
+        if updated_files:
+            self.writer.flush(team_state, team_interfaces_tracker.STATE_PATH)
+        self.team_state = team_state
+
+        if updated_files:
+            os.makedirs(json_to_csv.CSV_OUTPUT_PATH, exist_ok=True)
+            for json_path in sorted(set(updated_files)):
+                json_to_csv.process_team_file(json_path, json_to_csv.CSV_OUTPUT_PATH)
+
+    async def tick(self, client):
+        started = time.monotonic()
+        # Rewritten every tick, so it always describes the latest one
+        with run_report.run("daemon"):
+            with run_report.stage("check"):
+                output_data = await self.check(client)
+            with run_report.stage("track"):
+                self.track(output_data)
+        print(f"Tick finished in {time.monotonic() - started:.1f}s")
+
+    def reload_config(self):
+        try:
+            new_config = interfaces_check.read_health_config()
+        except (OSError, json.JSONDecodeError) as e:
+            # Most likely caught mid-save; the next change event retries
+            print(f"Error reloading configuration, keeping the previous one: {e}")
+            return
+        changed = interfaces_check.changed_requirements(interfaces_check.HEALTH_CONFIG, new_config)
+        interfaces_check.HEALTH_CONFIG = new_config
+        if not changed or self.last_output is None:
+            return
+        updated = interfaces_check.reassess(self.last_output, changed)
+        print(f"Configuration reloaded: {len(changed)} requirements changed, {updated} records re-judged")
+        interfaces_check.write_output(self.last_output)
+        # Same sweep as before, so it adds no latency samples
+        self.track(self.last_output, sample_latency=False)
+
+    def watch(self):
+        if self.config_watcher.changed():
+            self.reload_config()
+        if self.registry_watcher.changed():
+            self.registry = interfaces_check.load_registry()
+            print("Registry files changed, new targets apply from the next tick")
+
+    async def wait_for_next_tick(self, started):
+        while not self.stopping.is_set():
+            remaining = self.interval - (time.monotonic() - started)
+            if remaining <= 0:
+                return
+            try:
+                await asyncio.wait_for(self.stopping.wait(), min(remaining, WATCH_INTERVAL_SECONDS))
+            except asyncio.TimeoutError:
+                pass
+            try:
+                self.watch()
+            except Exception as e:
+                print(f"Error applying watched changes: {e or type(e).__name__}")
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self.stopping.set)
+        # A sweep may use the whole interval but never more, so ticks do not pile up
+        client = interfaces_check.create_client(dns_ttl=DNS_CACHE_TTL_SECONDS, deadline=self.interval)
+        async with client:
+            while not self.stopping.is_set():
+                started = time.monotonic()
+                try:
+                    await self.tick(client)
+                except Exception as e:
+                    print(f"Error during tick: {e or type(e).__name__}")
+                await self.wait_for_next_tick(started)
+        print("Daemon stopped")
+
+def main():
+    interval = int(sys.argv[1]) if len(sys.argv) > 1 else TICK_INTERVAL_SECONDS
+    print(f"Starting daemon, one tick every {interval}s")
+    asyncio.run(Daemon(interval).run())
+
+if __name__ == "__main__":
+    main()
@@ -4,49 +4,21 @@ import json
 import os
 import re
 from datetime import datetime, timezone
-from typing import Dict, List, Any, Set
+from typing import Dict, List, Any, Optional, Set, Tuple
 from collections import defaultdict
 
+import change_log
+import run_report
+
 # Paths
 BASE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-CHANGES_JSON_PATH = os.path.join(BASE_PATH, "changes.json")
+CHANGES_LOG_PATH = os.path.join(BASE_PATH, "changes.jsonl")
+CHANGES_JSON_PATH = os.path.join(BASE_PATH, "changes.json")  # read until the tracker converts it
 TEAM_DATA_PATH = os.path.join(BASE_PATH, "team-data")
 JSON_OUTPUT_PATH = os.path.join(TEAM_DATA_PATH, "json")
 SQL_OUTPUT_PATH = os.path.join(TEAM_DATA_PATH, "sql")
 GAP_FILLER_STATE_PATH = os.path.join(BASE_PATH, "gap_filler_state.json")
 
-def load_json_file(path: str) -> List[Dict[str, Any]]:
-    """Load JSON file and return as list."""
-    try:
-        with open(path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            if not isinstance(data, list):
-                print(f"Warning: Expected list, got {type(data)}")
-                return []
-            return data
-    except (FileNotFoundError, json.JSONDecodeError) as e:
-        print(f"Error loading {path}: {e}")
-        return []
-
-def save_json_file(data: List[Dict[str, Any]], path: str) -> None:
-    """Save data to JSON file."""
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=4)
-
-def append_to_json_file(data: List[Dict[str, Any]], path: str) -> None:
-    """Append data to existing JSON file."""
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    
-    # Load existing data
-    existing_data = load_json_file(path)
-    
-    # Append new data
-    existing_data.extend(data)
-    
-    # Save back to file
-    save_json_file(existing_data, path)
-
 def load_gap_filler_state() -> Dict[str, Any]:
     """Load gap filler state to track last processed timestamp."""
     try:
@@ -57,7 +29,8 @@ def load_gap_filler_state() -> Dict[str, Any]:
         return {
             "last_processed_timestamp": None,
             "migration_completed": False,
-            "total_entries_processed": 0
+            "total_entries_processed": 0,
+            "log_offset": None
         }
 
 def save_gap_filler_state(state: Dict[str, Any]) -> None:
@@ -133,9 +106,41 @@ def get_new_entries_since_timestamp(changes_data: List[Dict[str, Any]], last_tim
     
     return new_entries
 
+def read_new_entries(state: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """Entries added since the last run, and the log offset to resume from next time.
+
+    With a saved offset into changes.jsonl only the bytes after it are read,
+    so a run without new entries does not touch the history at all. The
+    first run on the log, or one whose offset no longer fits the file,
+    finds its place by timestamp once. The legacy changes.json has no
+    offsets and is always scanned by timestamp (offset None).
+    """
+    last_timestamp = state.get("last_processed_timestamp")
+    path = change_log.history_path(CHANGES_LOG_PATH, CHANGES_JSON_PATH)
+    if path is None:
+        print("Error: Could not find the change history")
+        return [], None
+    if path == CHANGES_JSON_PATH:
+        return get_new_entries_since_timestamp(list(change_log.iter_records(path)), last_timestamp), None
+
+    offset = state.get("log_offset")
+    if offset is not None and change_log.is_record_boundary(path, offset):
+        new_entries = []
+        for entry, offset in change_log.iter_records_from(path, offset):
+            new_entries.append(entry)
+        return new_entries, offset
+    if offset is not None:
+        print(f"Warning: saved offset {offset} does not fit {path}, locating new entries by timestamp")
+    new_entries = []
+    offset = 0
+    for entry, offset in change_log.iter_records_from(path):
+        if not last_timestamp or entry.get("timestamp", "") > last_timestamp:
+            new_entries.append(entry)
+    return new_entries, offset
+
 def main():
     print("Starting gap filler...")
-    print(f"Reading from: {CHANGES_JSON_PATH}")
+    print(f"Reading from: {change_log.history_path(CHANGES_LOG_PATH, CHANGES_JSON_PATH) or CHANGES_LOG_PATH}")
     
     # Load gap filler state
     state = load_gap_filler_state()
@@ -149,24 +154,23 @@ def main():
     
     print(f"Last processed timestamp: {last_timestamp or 'None (first run)'}")
     
-    # Load changes data
-    changes_data = load_json_file(CHANGES_JSON_PATH)
-    if not changes_data:
-        print("Error: Could not load changes.json")
-        return
-    
-    print(f"Loaded {len(changes_data)} total entries from changes.json")
-    
-    # Get new entries since last run
-    new_entries = get_new_entries_since_timestamp(changes_data, last_timestamp)
+    # Read only what was appended since the last run
+    with run_report.stage("read_new_entries") as counters:
+        new_entries, log_offset = read_new_entries(state)
+        counters["new_entries"] = len(new_entries)
     print(f"Found {len(new_entries)} new entries since last run")
     
     if not new_entries:
+        if log_offset != state.get("log_offset"):
+            state["log_offset"] = log_offset
+            save_gap_filler_state(state)
+            print(f"Updated log offset to: {log_offset}")
         print("No new entries to process")
         return
     
     # Parse new entries by team
-    team_changes = parse_changes_by_team(new_entries)
+    with run_report.stage("parse_by_team"):
+        team_changes = parse_changes_by_team(new_entries)
     print(f"Parsed changes for {len(team_changes)} teams")
     
     # Append to team-specific files
@@ -180,17 +184,22 @@ def main():
                 safe_team_name = re.sub(r'[^\w\-]', '_', team)
             
             json_path = os.path.join(JSON_OUTPUT_PATH, f"{safe_team_name}.json")
-            append_to_json_file(data, json_path)
+            with run_report.stage("append_team_files"):
+                change_log.append_team_entries(data, json_path)
+                run_report.count("entries", len(data))
             entries_processed += len(data)
-            print(f"Appended {len(data)} entries to {json_path}")
+            print(f"Appended {len(data)} entries to {change_log.team_log_path(json_path)}")
     
     # Update state
     if new_entries:
         latest_timestamp = max(entry.get("timestamp", "") for entry in new_entries)
         state["last_processed_timestamp"] = latest_timestamp
         state["total_entries_processed"] = state.get("total_entries_processed", 0) + entries_processed
+        state["log_offset"] = log_offset
         save_gap_filler_state(state)
         print(f"Updated last processed timestamp to: {latest_timestamp}")
+        if log_offset is not None:
+            print(f"Updated log offset to: {log_offset}")
     
     # Print summary
     print("\n=== Gap Filler Summary ===")
@@ -200,4 +209,5 @@ def main():
     print("Done!")
 
 if __name__ == "__main__":
-    main()
+    with run_report.run("gap_filler"):
+        main()
@@ -1,32 +1,89 @@
-import urllib.request
+import asyncio
+import bisect
+import codecs
+import functools
 import json
 import tomllib
 import ssl
-import time
 import re
 import os
-from datetime import datetime, UTC
-from bs4 import BeautifulSoup
-
-# Start time
-START_TIME = datetime.now(UTC).isoformat() + "Z"
+import time
+from datetime import datetime, timedelta, UTC
+from html.parser import HTMLParser
+from urllib.parse import urlsplit, urlunsplit
+from probe_client import CircuitBreaker, ConditionalCache, ProbeClient, RequestTiming, RetryPolicy, is_rejection, read_text
+import run_report
 
 # Enable / Disable Housefire
 ENABLE_HOUSEFIRE = True
 
 # Paths
-BASE_PATH = "_luminara-homebase"
+BASE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 CONFIG_PATH = os.path.join(BASE_PATH, "services_health_config.json")
 OUTPUT_PATH = os.path.join(BASE_PATH, "interface-status.json")
+CIRCUIT_BREAKER_PATH = os.path.join(BASE_PATH, "circuit_breaker_state.json")
+VERSION_CACHE_PATH = os.path.join(BASE_PATH, "interface_version_cache.json")
+HTTP_CACHE_PATH = os.path.join(BASE_PATH, "http_cache.json")
+
+# Probe concurrency: requests in flight overall and per host
+MAX_CONCURRENCY = 64
+MAX_CONCURRENCY_PER_HOST = 6
+
+# Retries back off exponentially with jitter; the deadline bounds the whole sweep
+# so one slow operator cannot push a run past the 30-minute cron window
+RETRY_POLICY = RetryPolicy(attempts=3, base_delay=0.5, max_delay=4.0, timeout=5)
+SWEEP_DEADLINE_SECONDS = 20 * 60
+
+# Hosts down for this many consecutive runs only get one short probe per request until they answer again
+CIRCUIT_BREAKER_THRESHOLD = 2
+CIRCUIT_BREAKER_PROBE_POLICY = RetryPolicy(attempts=1, timeout=2)
+
+# JS bundles are scanned in chunks; the overlap keeps a match split across two chunks intact
+VERSION_PATTERN = re.compile(rb'version\$1\s*=\s*"([^"]+)"')
+BUNDLE_CHUNK_SIZE = 64 * 1024
+BUNDLE_SCAN_OVERLAP = 256
+INDEX_CHUNK_SIZE = 16 * 1024
+
+# RPC nodes are asked for these CometBFT methods; "batch" sends them as one JSON-RPC
+# batch POST per node, "get" as one GET each. Batch mode falls back to GETs when refused
+RPC_METHODS = ("status", "abci_info", "net_info")
+RPC_PROBE_MODE = "batch"
+
+# The reference height is the median of the k highest heights that sit within the
+# max lag threshold of the overall median; below the quorum the plain maximum is used
+REFERENCE_QUORUM = 3
+REFERENCE_TOP_K = 3
+DEFAULT_REFERENCE_TOLERANCE = 150
+
+# Ordered from best to worst
+SYNC_STATES = ["sync_ok", "sync_lag", "sync_nok"]
+
+def read_health_config():
+    with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
 
 # Load configuration
 try:
-    with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-        HEALTH_CONFIG = json.load(f)
+    HEALTH_CONFIG = read_health_config()
 except (FileNotFoundError, json.JSONDecodeError) as e:
     print(f"Error loading configuration: {e}")
     HEALTH_CONFIG = {}
 
+# Public endpoint registries, read from the checkout and probed alongside the interfaces
+REGISTRY_BASE = os.path.join(os.path.dirname(BASE_PATH), "user-and-dev-tools")
+REGISTRY_SOURCES = {
+    "namada": os.path.join(REGISTRY_BASE, "mainnet")
+}
+if ENABLE_HOUSEFIRE:
+    REGISTRY_SOURCES["housefire"] = os.path.join(REGISTRY_BASE, "testnet", "housefire")
+
+# Registry file -> (service, field holding the endpoint URL)
+REGISTRY_FILES = {
+    "rpc.json": ("rpc", "RPC Address"),
+    "namada-indexers.json": ("indexer", "Indexer API URL"),
+    "masp-indexers.json": ("masp", "Indexer API URL")
+}
+
 # Interface sources
 INTERFACES = {
     "namada": {
@@ -41,57 +98,181 @@ if ENABLE_HOUSEFIRE:
 HEADERS = {"User-Agent": "Mozilla/5.0"}
 SSL_CONTEXT = ssl.create_default_context()
 
-def fetch_url(url, retries=3, timeout=5):
-    for attempt in range(retries):
-        try:
-            with urllib.request.urlopen(urllib.request.Request(url, headers=HEADERS), context=SSL_CONTEXT, timeout=timeout) as response:
-                return response.read().decode('utf-8')
-        except Exception as e:
-            if attempt == retries - 1:
-                print(f"Error fetching {url}: {e}")
-            time.sleep(2)
-    return None
-
-def fetch_url_bytes(url, retries=3, timeout=5):
-    for attempt in range(retries):
-        try:
-            with urllib.request.urlopen(urllib.request.Request(url, headers=HEADERS), context=SSL_CONTEXT, timeout=timeout) as response:
-                return response.read()
-        except Exception as e:
-            if attempt == retries - 1:
-                print(f"Error fetching bytes from {url}: {e}")
-            time.sleep(2)
-    return None
-
-def fetch_json(url):
-    data = fetch_url(url)
+def load_state(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def save_state(data, path):
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4)
+    except Exception as e:
+        print(f"Error writing {path}: {e}")
+
+async def scan_bundle_version(response):
+    """Stream a JS bundle and stop reading at the first version match.
+
+    Returns (version, bytes_read); version is None if the bundle has none.
+    """
+    tail = b""
+    bytes_read = 0
+    async for chunk in response.content.iter_chunked(BUNDLE_CHUNK_SIZE):
+        bytes_read += len(chunk)
+        window = tail + chunk
+        if match := VERSION_PATTERN.search(window):
+            # Drop the connection rather than draining the rest of the bundle
+            response.close()
+            return match.group(1).decode('utf-8', errors='replace'), bytes_read
+        tail = window[-BUNDLE_SCAN_OVERLAP:]
+    return None, bytes_read
+
+class _ScriptFound(Exception):
+    pass
+
+class ModuleScriptLocator(HTMLParser):
+    """Finds the first <script type="module" crossorigin> tag of an index page.
+
+    Parsing stops at that tag instead of building a document tree, and the
+    page can be fed chunk by chunk as it is downloaded.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.found = False
+        self.src = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag != "script":
+            return
+        attrs = dict(attrs)
+        if attrs.get("type") == "module" and "crossorigin" in attrs:
+            self.found = True
+            self.src = attrs.get("src")
+            raise _ScriptFound()
+
+    def scan(self, data):
+        """Feed more of the page and return True once the tag has been found."""
+        if not self.found:
+            try:
+                self.feed(data)
+            except _ScriptFound:
+                pass
+        return self.found
+
+def find_module_script_with_bs4(html):
+    # Optional fallback for pages the streaming locator cannot make sense of
+    try:
+        from bs4 import BeautifulSoup
+    except ImportError:
+        return None
+    with run_report.stage("bs4_fallback"):
+        script = BeautifulSoup(html, "html.parser").find("script", {"type": "module", "crossorigin": True})
+    return script["src"] if script and "src" in script.attrs else None
+
+async def locate_module_script(response):
+    """Stream an index page and return the module script src, or None."""
+    locator = ModuleScriptLocator()
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    page = []
+    async for chunk in response.content.iter_chunked(INDEX_CHUNK_SIZE):
+        text = decoder.decode(chunk)
+        page.append(text)
+        if locator.scan(text):
+            response.close()
+            return locator.src
+    text = decoder.decode(b"", final=True)
+    page.append(text)
+    if locator.scan(text):
+        return locator.src
+    return find_module_script_with_bs4("".join(page))
+
+async def fetch_url(client, url, policy=None, timing=None):
+    try:
+        return await client.fetch(url, read_text, policy, timing=timing)
+    except Exception as e:
+        print(f"Error fetching {url}: {e or type(e).__name__}")
+        return None
+
+async def fetch_conditional(client, url):
+    try:
+        return await client.fetch_conditional(url)
+    except Exception as e:
+        print(f"Error fetching {url}: {e or type(e).__name__}")
+        return None
+
+async def fetch_json(client, url, timing=None):
+    data = await fetch_url(client, url, timing=timing)
     try:
         return json.loads(data) if data else {}
     except json.JSONDecodeError as e:
         print(f"Error parsing JSON from {url}: {e}")
         return {}
 
-def get_interface_version(url):
-    if not (r := fetch_url(url)):
+class BundleVersionCache:
+    """Interface URL -> version extracted from its content-hashed JS bundle.
+
+    A Namadillo deployment only changes when its bundle URL does, so a matching
+    bundle URL gives the version without downloading the bundle again.
+    """
+
+    def __init__(self, entries=None):
+        self.entries = dict(entries or {})
+        self.hits = 0
+        self.misses = 0
+        self.bytes_avoided = 0
+        self.bytes_downloaded = 0
+
+    def lookup(self, interface_url, bundle_url):
+        entry = self.entries.get(interface_url)
+        if entry and entry.get("bundle_url") == bundle_url:
+            self.hits += 1
+            self.bytes_avoided += entry.get("bundle_bytes", 0)
+            return entry["version"]
+        self.misses += 1
+        return None
+
+    def store(self, interface_url, bundle_url, version, bundle_bytes):
+        self.bytes_downloaded += bundle_bytes
+        self.entries[interface_url] = {"bundle_url": bundle_url, "version": version, "bundle_bytes": bundle_bytes}
+
+    def summary(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "bytes_avoided": self.bytes_avoided,
+            "bytes_downloaded": self.bytes_downloaded
+        }
+
+async def get_interface_version(client, url, version_cache):
+    try:
+        src = await client.fetch(url, locate_module_script)
+    except Exception as e:
+        print(f"Error fetching {url}: {e or type(e).__name__}")
         return "n/a"
     try:
-        soup = BeautifulSoup(r, "html.parser")
-        script = soup.find("script", {"type": "module", "crossorigin": True})
-        if script and "src" in script.attrs:
-            js_url = f"{url.rstrip('/')}/{script['src'].lstrip('/')}"
-            js_content = fetch_url(js_url)
-            if js_content and (match := re.search(r'version\$1\s*=\s*"([^"]+)"', js_content)):
-                return match.group(1)
+        if src:
+            js_url = f"{url.rstrip('/')}/{src.lstrip('/')}"
+            if cached_version := version_cache.lookup(url, js_url):
+                return cached_version
+            version, bytes_read = await client.fetch(js_url, scan_bundle_version)
+            if version:
+                version_cache.store(url, js_url, version, bytes_read)
+                return version
     except Exception as e:
         print(f"Error getting interface version from {url}: {e}")
     return "n/a"
 
-def parse_config(url):
-    data = fetch_url_bytes(f"{url}/config.toml", timeout=5)
+async def parse_config(client, url):
+    data = await fetch_conditional(client, f"{url}/config.toml")
     if not data:
         return {"rpc": "n/a", "indexer": "n/a", "masp": "n/a"}
     try:
-        config = tomllib.loads(data.decode("utf-8"))
+        config = tomllib.loads(data)
         return {
             "rpc": config.get("rpc_url", "n/a"),
             "indexer": config.get("indexer_url", "n/a"),
@@ -120,16 +301,12 @@ def compare_versions(current, required):
     r_nums, r_suf = version_tuple(required)
     return c_nums == r_nums and c_suf == r_suf
 
-def determine_sync_state(block_height, reference_block, service_conf):
-    if not service_conf or reference_block == 0 or block_height == 0:
-        return "sync_nok"
-    thresholds = service_conf.get("block_lag_thresholds", {})
+def lag_state(lag, thresholds):
     if not isinstance(thresholds, dict) or "healthy" not in thresholds or "max" not in thresholds:
         return "sync_nok"
     try:
         healthy = int(thresholds["healthy"])
         max_lag = int(thresholds["max"])
-        lag = reference_block - block_height
         if lag <= healthy:
             return "sync_ok"
         elif lag <= max_lag:
@@ -138,12 +315,100 @@ def determine_sync_state(block_height, reference_block, service_conf):
     except (ValueError, TypeError):
         return "sync_nok"
 
-def get_service_data(service, url):
+def determine_sync_state(block_height, reference_block, service_conf, seconds_behind=None):
+    if not service_conf or reference_block == 0 or block_height == 0:
+        return "sync_nok"
+    state = lag_state(reference_block - block_height, service_conf.get("block_lag_thresholds", {}))
+    # Time thresholds are optional; when both apply the worse verdict wins
+    if seconds_behind is not None and "time_lag_thresholds" in service_conf:
+        time_state = lag_state(seconds_behind, service_conf["time_lag_thresholds"])
+        state = max(state, time_state, key=SYNC_STATES.index)
+    return state
+
+def parse_block_time(value):
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    # CometBFT reports UTC; keep every parsed time comparable with the others
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=UTC)
+
+def average_block_time(sync_info):
+    """Seconds per block over the node's retained history, from the earliest and latest block in sync_info."""
+    try:
+        blocks = int(sync_info.get("latest_block_height", 0)) - int(sync_info.get("earliest_block_height", 0))
+    except (TypeError, ValueError):
+        return None
+    latest = parse_block_time(sync_info.get("latest_block_time"))
+    earliest = parse_block_time(sync_info.get("earliest_block_time"))
+    if blocks <= 0 or latest is None or earliest is None:
+        return None
+    return round((latest - earliest).total_seconds() / blocks, 3)
+
+def elapsed_ms(started):
+    return round((time.perf_counter() - started) * 1000, 1)
+
+async def timed(awaitable):
+    # Wall time of a request including its retries, so the critical path shows up in the output
+    started = time.perf_counter()
+    result = await awaitable
+    return result, elapsed_ms(started)
+
+async def timed_json(client, url):
+    """fetch_json plus the wall time and connection phases of the request."""
+    timing = RequestTiming()
+    started = time.perf_counter()
+    data = await fetch_json(client, url, timing)
+    return data, {"total_ms": elapsed_ms(started), **timing.phases()}
+
+async def fetch_rpc_batch(client, url):
+    """All RPC_METHODS in one JSON-RPC batch POST.
+
+    Returns (replies by method, timing); replies is None when the node refused
+    the batch or answered it with something other than a batch response.
+    """
+    batch = [{"jsonrpc": "2.0", "id": i, "method": method, "params": {}} for i, method in enumerate(RPC_METHODS)]
+    timing = RequestTiming()
+    started = time.perf_counter()
+    try:
+        data = await client.fetch(url, read_text, method="POST", json=batch, timing=timing)
+        replies = json.loads(data)
+    except json.JSONDecodeError:
+        replies = None
+    except Exception as e:
+        if is_rejection(e):
+            replies = None
+        else:
+            # Unreachable nodes are reported down without trying each method again
+            print(f"Error fetching {url}: {e or type(e).__name__}")
+            replies = []
+    batch_timing = {"total_ms": elapsed_ms(started), **timing.phases()}
+    if not isinstance(replies, list):
+        return None, batch_timing
+    by_id = {reply.get("id"): reply for reply in replies if isinstance(reply, dict)}
+    return {method: by_id.get(i, {}) for i, method in enumerate(RPC_METHODS)}, batch_timing
+
+async def fetch_rpc_methods(client, url):
+    """RPC_METHODS as (replies by method, timings by endpoint), batched when the node allows it."""
+    timings = {}
+    if RPC_PROBE_MODE == "batch":
+        replies, timings["jsonrpc_batch"] = await fetch_rpc_batch(client, url)
+        if replies is not None:
+            return replies, timings
+    results = await asyncio.gather(*(timed_json(client, f"{url}/{method}") for method in RPC_METHODS))
+    replies = {}
+    for method, (reply, timing) in zip(RPC_METHODS, results):
+        replies[method] = reply
+        timings[f"/{method}"] = timing
+    return replies, timings
+
+async def get_service_data(client, service, url):
     if not url or url == "n/a":
         return None
-        
+
     if service == "rpc":
-        rpc_status = fetch_json(f"{url}/status")
+        replies, timings = await fetch_rpc_methods(client, url)
+        rpc_status = replies.get("status")
         if not rpc_status or "result" not in rpc_status:
             return {
                 "service": service,
@@ -152,11 +417,18 @@ def get_service_data(service, url):
                 "version": "n/a",
                 "is_up_to_date": False,
                 "namada_version": "n/a",
-                "latest_block_height": "0"
+                "latest_block_height": "0",
+                "latest_block_time": "n/a",
+                "avg_block_time": "n/a",
+                "app_version": "n/a",
+                "n_peers": "n/a",
+                "timings": timings
             }
-            
+
         sync_info = rpc_status.get("result", {}).get("sync_info", {})
         node_info = rpc_status.get("result", {}).get("node_info", {})
+        abci_info = (replies.get("abci_info") or {}).get("result", {}).get("response", {})
+        net_info = (replies.get("net_info") or {}).get("result", {})
         service_data = {
             "service": service,
             "url": url,
@@ -164,16 +436,26 @@ def get_service_data(service, url):
             "version": node_info.get("version", "n/a"),
             "is_up_to_date": False,
             "namada_version": extract_moniker_version(node_info.get("moniker", "")),
-            "latest_block_height": str(sync_info.get("latest_block_height", "0"))
+            "latest_block_height": str(sync_info.get("latest_block_height", "0")),
+            "latest_block_time": sync_info.get("latest_block_time", "n/a"),
+            "avg_block_time": average_block_time(sync_info) or "n/a",
+            "app_version": abci_info.get("version", "n/a"),
+            "n_peers": str(net_info.get("n_peers", "n/a")),
+            "timings": timings
         }
     else:
         if "indexer" in service:
-            block_data = fetch_json(f"{url}/api/v1/chain/block/latest")
+            block_path = "/api/v1/chain/block/latest"
         else:
-            block_data = fetch_json(f"{url}/api/v1/height")
-            
-        health_data = fetch_json(f"{url}/health")
-        
+            block_path = "/api/v1/height"
+
+        # Both requests are independent, so the probe costs the slower of the two
+        (block_data, block_timing), (health_data, health_timing) = await asyncio.gather(
+            timed_json(client, f"{url}{block_path}"),
+            timed_json(client, f"{url}/health")
+        )
+        timings = {block_path: block_timing, "/health": health_timing}
+
         if not block_data or not health_data:
             return {
                 "service": service,
@@ -181,114 +463,546 @@ def get_service_data(service, url):
                 "status": "down",
                 "version": "n/a",
                 "is_up_to_date": False,
-                "latest_block_height": "0"
+                "latest_block_height": "0",
+                "timings": timings
             }
-            
+
         service_data = {
             "service": service,
             "url": url,
             "status": "up",
             "version": health_data.get("version", "n/a"),
             "is_up_to_date": False,
-            "latest_block_height": str(block_data.get("block_height") or block_data.get("block") or "0")
+            "latest_block_height": str(block_data.get("block_height") or block_data.get("block") or "0"),
+            "timings": timings
         }
-    
+
     return service_data
 
-# --- First pass: collect all data and block heights ---
-network_block_heights = {}
-network_data = {}
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+def normalize_url(url):
+    """Canonical form of a service URL, so spelling variants of one endpoint compare equal.
+
+    URLs that cannot be parsed (a malformed port or IPv6 host, a value that is
+    not a string) are keyed by their raw text; probing them reports the service down.
+    """
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except (AttributeError, TypeError, ValueError):
+        return str(url)
+    scheme = parts.scheme.lower()
+    netloc = (parts.hostname or "").lower()
+    if ":" in netloc:
+        # IPv6 literals keep their brackets
+        netloc = f"[{netloc}]"
+    if port and port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{port}"
+    return urlunsplit((scheme, netloc, parts.path.rstrip('/'), parts.query, ""))
+
+def endpoint_key(service, url):
+    return (service, normalize_url(url))
+
+class ServiceProbeCache:
+    """(service, normalized URL) -> probe result, shared by everything probed in one sweep.
+
+    Teams often point their config.toml at the same RPC, indexer or MASP
+    endpoint, and the registries list many of them again. The first reference
+    starts the probe; later ones await the same task and get their own copy of
+    the result, so each distinct endpoint is requested once per sweep.
+    With a scheduler, endpoints that are not due reuse their last probe.
+    """
+
+    def __init__(self, scheduler=None):
+        self.tasks = {}
+        self.references = 0
+        self.scheduler = scheduler
+
+    async def probe(self, client, service, url, key):
+        if self.scheduler is None:
+            return await get_service_data(client, service, url)
+        cached = self.scheduler.cached(key)
+        if cached is not None:
+            return cached
+        service_data = await get_service_data(client, service, url)
+        self.scheduler.store(key, service_data)
+        return {**service_data, "probe_age_seconds": 0}
+
+    async def get(self, client, service, url):
+        self.references += 1
+        key = endpoint_key(service, url)
+        if key not in self.tasks:
+            self.tasks[key] = asyncio.ensure_future(self.probe(client, service, url, key))
+        service_data = await self.tasks[key]
+        # Every reference is assessed and reported on its own, under the URL it was listed with
+        return {**service_data, "url": url}
+
+    def summary(self):
+        return {
+            "references": self.references,
+            "distinct_endpoints": len(self.tasks),
+            "deduplicated_probes": self.references - len(self.tasks)
+        }
+
+class ReferenceHeight:
+    """Reference block height of one network, fed by service records as they arrive.
+
+    Heights are kept sorted as they come in, one per distinct endpoint, so the
+    estimate is available as soon as the last probe returns. Endpoints more
+    than `tolerance` blocks above the median are treated as forked or
+    misreporting and left out, so a single inflated height cannot mark every
+    other operator as lagging. The records themselves are kept for assessment.
+    Freshly probed RPC records also contribute the time of their latest
+    block, so seconds behind is measured against the newest block among the
+    endpoints the reference is built from. Their average block time, whose
+    median turns block lag into seconds where an endpoint reports no block
+    time, is kept as well.
+
+    With a scheduler, healthy endpoints back off and are served from their
+    last probe, so the endpoints probed afresh are mostly the unhealthy ones.
+    Endpoints that were last assessed healthy therefore always count, their
+    height carried forward by probe_age_seconds at the median block time and
+    their latest block time by probe_age_seconds itself. Other heights served from an earlier probe are only used when too few
+    endpoints are left to form a quorum.
+    """
+
+    def __init__(self, tolerance=DEFAULT_REFERENCE_TOLERANCE, quorum=REFERENCE_QUORUM, top_k=REFERENCE_TOP_K,
+                 last_assessment=None):
+        self.tolerance = tolerance
+        self.quorum = quorum
+        self.top_k = top_k
+        # endpoint key -> {"sync_state", ...} from the sweep that last probed it, or None
+        self.last_assessment = last_assessment
+        self.heights = []
+        self.stale_heights = []
+        self.block_times = []
+        # (height, latest block time) of freshly probed endpoints that report one
+        self.latest_times = []
+        self.endpoints = {}
+        # endpoint key -> probe age, for cached endpoints that were last seen healthy
+        self.carried = {}
+        # endpoint key -> latest block time as probed, for carried endpoints that report one
+        self.carried_times = {}
+        self.records = []
+
+    def was_healthy(self, key, service_data):
+        if self.last_assessment is None or service_data.get("status") != "up":
+            return False
+        previous = self.last_assessment(key)
+        return previous is not None and previous.get("sync_state") == "sync_ok"
+
+    def add(self, service_data):
+        self.records.append(service_data)
+        key = endpoint_key(service_data["service"], service_data["url"])
+        try:
+            height = int(service_data.get("latest_block_height", 0))
+        except Exception:
+            return
+        if height <= 0 or key in self.endpoints:
+            return
+        self.endpoints[key] = height
+        # A long-run average, so an older probe still gives a usable value
+        if isinstance(service_data.get("avg_block_time"), float):
+            bisect.insort(self.block_times, service_data["avg_block_time"])
+        age = service_data.get("probe_age_seconds")
+        if not age:
+            bisect.insort(self.heights, height)
+            latest = parse_block_time(service_data.get("latest_block_time"))
+            if latest is not None:
+                self.latest_times.append((height, latest))
+        elif self.was_healthy(key, service_data):
+            self.carried[key] = age
+            latest = parse_block_time(service_data.get("latest_block_time"))
+            if latest is not None:
+                self.carried_times[key] = latest
+        else:
+            bisect.insort(self.stale_heights, height)
+
+    def block_time(self):
+        if not self.block_times:
+            return None
+        return self.block_times[(len(self.block_times) - 1) // 2]
+
+    def reference_time(self, ref_block):
+        """Time of the newest block among fresh and carried endpoints that are not outliers, or None."""
+        times = [latest for height, latest in self.latest_times if height <= ref_block + self.tolerance]
+        for key, latest in self.carried_times.items():
+            if self.current_height(key) <= ref_block + self.tolerance:
+                times.append(latest + timedelta(seconds=self.carried[key]))
+        return max(times) if times else None
+
+    def current_height(self, key):
+        """The endpoint's height, carried forward to now if it was served from cache while healthy."""
+        height = self.endpoints[key]
+        block_time = self.block_time()
+        if key in self.carried and block_time:
+            height += int(self.carried[key] / block_time)
+        return height
+
+    def estimate(self):
+        """Return (reference height, outlier endpoints)."""
+        heights = self.heights
+        if self.carried:
+            heights = sorted(heights + [self.current_height(key) for key in self.carried])
+        if len(heights) < self.quorum and self.stale_heights:
+            heights = sorted(heights + self.stale_heights)
+        if not heights:
+            return 0, []
+        if len(heights) < self.quorum:
+            return heights[-1], []
+        median = heights[(len(heights) - 1) // 2]
+        cutoff = bisect.bisect_right(heights, median + self.tolerance)
+        top = heights[max(cutoff - self.top_k, 0):cutoff]
+        outliers = []
+        for service, url in sorted(self.endpoints):
+            height = self.current_height((service, url))
+            if height > median + self.tolerance:
+                outliers.append({"service": service, "url": url, "latest_block_height": height})
+        return top[(len(top) - 1) // 2], outliers
+
+def reference_tolerance(config_ref):
+    thresholds = [
+        service_conf.get("block_lag_thresholds", {}).get("max")
+        for service_conf in config_ref.get("services", {}).values()
+    ]
+    thresholds = [int(t) for t in thresholds if isinstance(t, int)]
+    return max(thresholds) if thresholds else DEFAULT_REFERENCE_TOLERANCE
+
+async def probe_services(client, interface_url, probe_cache, reference):
+    config, config_ms = await timed(parse_config(client, interface_url))
+    settings, services_ms = await timed(asyncio.gather(*(
+        probe_cache.get(client, service, url) for service, url in config.items() if url and url != "n/a"
+    )))
+    settings = sorted((s for s in settings if s), key=lambda x: x["service"])
+    for service_data in settings:
+        reference.add(service_data)
+    return settings, {"config.toml": config_ms, "services": services_ms}
+
+async def probe_interface(client, interface, config_ref, version_cache, probe_cache, reference):
+    interface_url = interface.get("Interface URL", "").rstrip('/')
+    started = time.perf_counter()
+    # Service probes start as soon as config.toml arrives, without waiting for the version lookup
+    (settings, timings), (interface_version, version_ms) = await asyncio.gather(
+        probe_services(client, interface_url, probe_cache, reference),
+        timed(get_interface_version(client, interface_url, version_cache))
+    )
+    timings["version"] = version_ms
+    timings["total"] = elapsed_ms(started)
+    # Use the correct required version for each network
+    interface_required_version = config_ref.get("interface", {}).get("required_version", "n/a")
+    return {
+        "team": interface.get("Team or Contributor Name", "Unknown"),
+        "discord": interface.get("Discord UserName", "Unknown"),
+        "url": interface_url,
+        "status": "up" if interface_version != "n/a" else "down",
+        "version": interface_version,
+        "is_up_to_date": compare_versions(interface_version, interface_required_version),
+        "settings": settings,
+        "timings": timings
+    }
 
-for network, sources in INTERFACES.items():
-    interfaces_json = fetch_url(sources["interface"], timeout=5)
+async def probe_network(client, network, sources, version_cache, probe_cache, reference):
+    interfaces_json = await fetch_conditional(client, sources["interface"])
     if not interfaces_json:
-        continue
+        return None
     try:
         interfaces = json.loads(interfaces_json)
     except json.JSONDecodeError:
         print(f"Error parsing interfaces JSON for network {network}")
-        continue
-    network_interfaces = []
+        return None
     config_ref = HEALTH_CONFIG.get(network, {})
-    block_heights = []
-    for interface in interfaces:
-        if "Namadillo" not in interface.get("Interface Name (Namadillo or Custom)", ""):
-            continue
-        interface_url = interface.get("Interface URL", "").rstrip('/')
-        if not interface_url:
+    namadillo_interfaces = [
+        interface for interface in interfaces
+        if "Namadillo" in interface.get("Interface Name (Namadillo or Custom)", "")
+        and interface.get("Interface URL", "").rstrip('/')
+    ]
+    return await asyncio.gather(*(probe_interface(client, interface, config_ref, version_cache, probe_cache, reference) for interface in namadillo_interfaces))
+
+def load_registry_targets(path):
+    """Probe targets from a network's registry files, one per distinct service URL.
+
+    Returns (targets, entries_read); each target lists every team and file that
+    mentions it, so an endpoint listed several times is still probed once.
+    """
+    targets = {}
+    entries_read = 0
+    for filename, (service, url_field) in REGISTRY_FILES.items():
+        try:
+            with open(os.path.join(path, filename), "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError) as e:
+            print(f"Error loading registry {filename} from {path}: {e}")
             continue
-        config = parse_config(interface_url)
-        settings = [get_service_data(service, url) for service, url in config.items() if url != "n/a"]
-        settings = [s for s in settings if s]
-        # Collect block heights
-        for s in settings:
-            try:
-                height = int(s.get("latest_block_height", 0))
-                if height > 0:
-                    block_heights.append(height)
-            except Exception:
-                pass
-        interface_version = get_interface_version(interface_url)
-        # Use the correct required version for each network
-        interface_required_version = config_ref.get("interface", {}).get("required_version", "n/a")
-        interface_entry = {
-            "team": interface.get("Team or Contributor Name", "Unknown"),
-            "discord": interface.get("Discord UserName", "Unknown"),
-            "url": interface_url,
-            "status": "up" if interface_version != "n/a" else "down",
-            "version": interface_version,
-            "is_up_to_date": compare_versions(interface_version, interface_required_version),
-            "settings": settings
+        for entry in entries:
+            # Undexer exposes a different API from namada-indexer
+            if entry.get("Which Indexer", "namada-indexer") != "namada-indexer":
+                continue
+            url = entry.get(url_field, "").strip().rstrip('/')
+            if not url:
+                continue
+            if "://" not in url:
+                url = f"https://{url}"
+            entries_read += 1
+            target = targets.setdefault((service, normalize_url(url)), {"service": service, "url": url, "teams": [], "sources": []})
+            team = entry.get("Team or Contributor Name", "Unknown")
+            if team not in target["teams"]:
+                target["teams"].append(team)
+            if filename not in target["sources"]:
+                target["sources"].append(filename)
+    return list(targets.values()), entries_read
+
+async def probe_registry_target(client, target, probe_cache, reference):
+    service_data = await probe_cache.get(client, target["service"], target["url"])
+    endpoint = {"teams": target["teams"], "sources": target["sources"], **service_data}
+    reference.add(endpoint)
+    return endpoint
+
+async def probe_registry(client, registry_targets, probe_cache, references):
+    results = await asyncio.gather(*(
+        asyncio.gather(*(probe_registry_target(client, target, probe_cache, references[network]) for target in targets))
+        for network, targets in registry_targets.items()
+    ))
+    return dict(zip(registry_targets, results))
+
+def create_client(breaker=None, http_cache=None, dns_ttl=None, deadline=SWEEP_DEADLINE_SECONDS):
+    return ProbeClient(
+        MAX_CONCURRENCY, MAX_CONCURRENCY_PER_HOST, HEADERS, SSL_CONTEXT, dns_ttl=dns_ttl,
+        retry_policy=RETRY_POLICY, deadline=deadline, breaker=breaker, http_cache=http_cache
+    )
+
+def load_registry():
+    """Registry targets per network, plus how many entries they were built from."""
+    registry_targets = {}
+    registry_stats = {}
+    for network, path in REGISTRY_SOURCES.items():
+        registry_targets[network], entries_read = load_registry_targets(path)
+        registry_stats[network] = {"entries": entries_read, "probed_endpoints": len(registry_targets[network])}
+    return registry_targets, registry_stats
+
+async def collect_network_data(client, version_cache, registry_targets, scheduler=None):
+    # Shared across networks too: housefire interfaces often reuse mainnet-hosted infrastructure
+    probe_cache = ServiceProbeCache(scheduler)
+    references = {
+        network: ReferenceHeight(
+            reference_tolerance(HEALTH_CONFIG.get(network, {})),
+            last_assessment=functools.partial(scheduler.assessment, network) if scheduler is not None else None
+        )
+        for network in [*INTERFACES, *registry_targets]
+    }
+    results, registry_data = await asyncio.gather(
+        asyncio.gather(*(
+            probe_network(client, network, sources, version_cache, probe_cache, references[network])
+            for network, sources in INTERFACES.items()
+        )),
+        probe_registry(client, registry_targets, probe_cache, references)
+    )
+    network_data = {network: interfaces for network, interfaces in zip(INTERFACES, results) if interfaces is not None}
+    return network_data, registry_data, references, {"http_pool": client.pool_stats(), "service_probes": probe_cache.summary()}
+
+def assess_service(service_data, ref_block, config_ref, block_time=None, ref_time=None):
+    # Use the correct required version for each network/service
+    try:
+        height = int(service_data.get("latest_block_height", 0))
+    except Exception:
+        height = 0
+    seconds_behind = None
+    latest = parse_block_time(service_data.get("latest_block_time"))
+    if ref_time is not None and latest is not None and height > 0:
+        # Real time between the reference's newest block and this endpoint's, so a stalled node shows even when blocks are slow
+        seconds_behind = round(max((ref_time - latest).total_seconds(), 0))
+    elif block_time and height > 0 and ref_block > 0:
+        # No block time reported (indexer, MASP): estimate from the block lag
+        seconds_behind = round(max(ref_block - height, 0) * block_time)
+    service_data["seconds_behind"] = seconds_behind if seconds_behind is not None else "n/a"
+    service_conf = config_ref.get("services", {}).get(service_data["service"], {})
+    service_data["sync_state"] = determine_sync_state(height, ref_block, service_conf, seconds_behind)
+    service_data["is_up_to_date"] = compare_versions(service_data.get("version", "n/a"), service_conf.get("required_version", "n/a"))
+
+def assess_references(references, run_stats, scheduler=None):
+    """Assign sync_state and is_up_to_date to every collected record against its network's reference.
+
+    Records served from an earlier probe keep the sync state they were given
+    then, since their height is as old as the probe.
+    """
+    network_block_heights = {}
+    run_stats["reference"] = {}
+    for network, reference in references.items():
+        ref_block, outliers = reference.estimate()
+        block_time = reference.block_time()
+        ref_time = reference.reference_time(ref_block)
+        network_block_heights[network] = ref_block
+        config_ref = HEALTH_CONFIG.get(network, {})
+        for service_data in reference.records:
+            assess_service(service_data, ref_block, config_ref, block_time, ref_time)
+            if scheduler is None:
+                continue
+            key = endpoint_key(service_data["service"], service_data["url"])
+            if not service_data.get("probe_age_seconds"):
+                scheduler.observe(network, key, service_data)
+            elif previous := scheduler.assessment(network, key):
+                service_data.update(previous)
+        run_stats["reference"][network] = {
+            "height": ref_block,
+            "block_time": block_time,
+            "latest_block_time": ref_time.isoformat() if ref_time is not None else None,
+            "responding_endpoints": len(reference.heights),
+            "carried_endpoints": len(reference.carried),
+            "outliers": outliers
         }
-        network_interfaces.append(interface_entry)
-    network_data[network] = network_interfaces
-    network_block_heights[network] = max(block_heights) if block_heights else 0
-
-# --- Calculate reference_latest_block_height for each network ---
-reference_latest_block_height = network_block_heights.get("namada", 0)
-housefire_reference_latest_block_height = network_block_heights.get("housefire", 0)
-
-# --- Second pass: assign sync_state and is_up_to_date using the correct reference height ---
-output_data = {
-    "script_start_time": START_TIME,
-    "script_end_time": "",
-    "reference_latest_block_height": str(reference_latest_block_height),
-    "housefire_reference_latest_block_height": str(housefire_reference_latest_block_height),
-    "required_versions": {
-        "interface": HEALTH_CONFIG.get("namada", {}).get("interface", {}).get("required_version", "n/a"),
-        "indexer": HEALTH_CONFIG.get("namada", {}).get("services", {}).get("indexer", {}).get("required_version", "n/a"),
-        "rpc": HEALTH_CONFIG.get("namada", {}).get("services", {}).get("rpc", {}).get("required_version", "n/a"),
-        "masp": HEALTH_CONFIG.get("namada", {}).get("services", {}).get("masp", {}).get("required_version", "n/a")
-    },
-    "housefire_required_versions": {
-        "interface": HEALTH_CONFIG.get("housefire", {}).get("interface", {}).get("required_version", "n/a"),
-        "indexer": HEALTH_CONFIG.get("housefire", {}).get("services", {}).get("indexer", {}).get("required_version", "n/a"),
-        "rpc": HEALTH_CONFIG.get("housefire", {}).get("services", {}).get("rpc", {}).get("required_version", "n/a"),
-        "masp": HEALTH_CONFIG.get("housefire", {}).get("services", {}).get("masp", {}).get("required_version", "n/a")
-    },
-    "networks": []
-}
+    return network_block_heights
 
-for network, interfaces in network_data.items():
+def required_versions(network):
     config_ref = HEALTH_CONFIG.get(network, {})
-    ref_block = network_block_heights.get(network, 0)
-    for interface in interfaces:
-        for s in interface["settings"]:
-            try:
-                height = int(s.get("latest_block_height", 0))
-            except Exception:
-                height = 0
-            # Use the correct required version for each network/service
-            service_conf = config_ref.get("services", {}).get(s["service"], {})
-            s["sync_state"] = determine_sync_state(height, ref_block, service_conf)
-            s["is_up_to_date"] = compare_versions(s.get("version", "n/a"), service_conf.get("required_version", "n/a"))
-        interface["settings"] = sorted(interface["settings"], key=lambda x: x["service"])
-    output_data["networks"].append({"network": network, "interface": interfaces})
-
-output_data["script_end_time"] = datetime.now(UTC).isoformat() + "Z"
+    return {
+        "interface": config_ref.get("interface", {}).get("required_version", "n/a"),
+        "indexer": config_ref.get("services", {}).get("indexer", {}).get("required_version", "n/a"),
+        "rpc": config_ref.get("services", {}).get("rpc", {}).get("required_version", "n/a"),
+        "masp": config_ref.get("services", {}).get("masp", {}).get("required_version", "n/a")
+    }
 
-try:
-    with open(OUTPUT_PATH, "w", encoding="utf-8") as json_file:
-        json.dump(output_data, json_file, indent=4, sort_keys=False)
-except Exception as e:
-    print(f"Error writing output file: {e}")
+def build_output(start_time, network_data, registry_data, network_block_heights, run_stats):
+    # --- Calculate reference_latest_block_height for each network ---
+    reference_latest_block_height = network_block_heights.get("namada", 0)
+    housefire_reference_latest_block_height = network_block_heights.get("housefire", 0)
+
+    output_data = {
+        "script_start_time": start_time,
+        "script_end_time": "",
+        "reference_latest_block_height": str(reference_latest_block_height),
+        "housefire_reference_latest_block_height": str(housefire_reference_latest_block_height),
+        "required_versions": required_versions("namada"),
+        "housefire_required_versions": required_versions("housefire"),
+        "networks": [{"network": network, "interface": interfaces} for network, interfaces in network_data.items()],
+        "registry": [{"network": network, "endpoints": endpoints} for network, endpoints in registry_data.items()]
+    }
+    output_data["script_end_time"] = datetime.now(UTC).isoformat() + "Z"
+    output_data["run_stats"] = run_stats
+    return output_data
+
+def changed_requirements(old_config, new_config):
+    """(network, service) pairs whose settings differ between two health configurations.
+
+    Interface requirements are reported under the service name "interface".
+    """
+    changed = set()
+    for network in old_config.keys() | new_config.keys():
+        old_network = old_config.get(network, {})
+        new_network = new_config.get(network, {})
+        if old_network.get("interface") != new_network.get("interface"):
+            changed.add((network, "interface"))
+        old_services = old_network.get("services", {})
+        new_services = new_network.get("services", {})
+        for service in old_services.keys() | new_services.keys():
+            if old_services.get(service) != new_services.get(service):
+                changed.add((network, service))
+    return changed
+
+def reassess(output_data, changed):
+    """Re-judge the records of a finished sweep whose requirements changed, without probing again.
+
+    Uses each network's reference height and block time from run_stats and the
+    current HEALTH_CONFIG. Records served from an earlier probe only get their
+    is_up_to_date recomputed, since their height is older than the reference.
+    Returns the number of records updated.
+    """
+    reference_stats = output_data.get("run_stats", {}).get("reference", {})
+    sections = [(entry["network"], [s for interface in entry["interface"] for s in interface["settings"]]) for entry in output_data["networks"]]
+    sections += [(entry["network"], entry["endpoints"]) for entry in output_data.get("registry", [])]
+    updated = 0
+    for entry in output_data["networks"]:
+        if (entry["network"], "interface") not in changed:
+            continue
+        required = HEALTH_CONFIG.get(entry["network"], {}).get("interface", {}).get("required_version", "n/a")
+        for interface in entry["interface"]:
+            interface["is_up_to_date"] = compare_versions(interface["version"], required)
+            updated += 1
+    for network, records in sections:
+        config_ref = HEALTH_CONFIG.get(network, {})
+        stats = reference_stats.get(network, {})
+        for service_data in records:
+            if (network, service_data["service"]) not in changed:
+                continue
+            if service_data.get("probe_age_seconds"):
+                service_conf = config_ref.get("services", {}).get(service_data["service"], {})
+                service_data["is_up_to_date"] = compare_versions(service_data.get("version", "n/a"), service_conf.get("required_version", "n/a"))
+            else:
+                assess_service(service_data, stats.get("height", 0), config_ref, stats.get("block_time"),
+                               parse_block_time(stats.get("latest_block_time")))
+            updated += 1
+    output_data["required_versions"] = required_versions("namada")
+    output_data["housefire_required_versions"] = required_versions("housefire")
+    return updated
+
+def print_summary(run_stats):
+    pool = run_stats["http_pool"]
+    print(f"HTTP pool: {pool['requests']} requests, {pool['connections_opened']} connections opened, {pool['connections_reused']} reused, {pool['retries']} retries")
+    breaker_stats = run_stats["circuit_breaker"]
+    print(f"Circuit breaker: {breaker_stats['open_hosts']} hosts open, {breaker_stats['short_circuited_requests']} requests short-circuited")
+    cache_stats = run_stats["version_cache"]
+    print(f"Version cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, {cache_stats['bytes_avoided']} bundle bytes avoided")
+    for network, stats in run_stats["registry"].items():
+        print(f"Registry {network}: {stats['entries']} entries, {stats['probed_endpoints']} distinct endpoints probed")
+    probe_stats = run_stats["service_probes"]
+    print(f"Service probes: {probe_stats['distinct_endpoints']} distinct endpoints for {probe_stats['references']} references, {probe_stats['deduplicated_probes']} probes deduplicated")
+    for network, stats in run_stats["reference"].items():
+        print(f"Reference {network}: height {stats['height']} from {stats['responding_endpoints']} endpoints and {stats.get('carried_endpoints', 0)} carried forward, {len(stats['outliers'])} outliers excluded")
+    http_cache_stats = run_stats["http_cache"]
+    print(f"HTTP cache: {http_cache_stats['not_modified']} not modified, {http_cache_stats['downloaded']} downloaded")
+
+def write_output(output_data):
+    try:
+        with open(OUTPUT_PATH, "w", encoding="utf-8") as json_file:
+            json.dump(output_data, json_file, indent=4, sort_keys=False)
+    except Exception as e:
+        print(f"Error writing output file: {e}")
+
+async def run_check(client, breaker, version_cache, http_cache, registry, scheduler=None):
+    """One sweep over every network through an open client; returns the interface-status document.
+
+    The breaker, caches and client are updated in place and left to the
+    caller to persist, so a long-running process can keep them between sweeps.
+    """
+    start_time = datetime.now(UTC).isoformat() + "Z"
+    registry_targets, registry_stats = registry
+    client.start_sweep()
+    if scheduler is not None:
+        scheduler.start_sweep()
+    # --- Probe every network concurrently; reference heights build up as results arrive ---
+    network_data, registry_data, references, run_stats = await collect_network_data(client, version_cache, registry_targets, scheduler)
+    run_stats["registry"] = registry_stats
+    breaker.end_run(start_time)
+    run_stats["circuit_breaker"] = breaker.summary()
+    run_stats["version_cache"] = version_cache.summary()
+    run_stats["http_cache"] = http_cache.summary()
+    with run_report.stage("assess"):
+        network_block_heights = assess_references(references, run_stats, scheduler)
+        if scheduler is not None:
+            run_stats["scheduler"] = scheduler.summary()
+        return build_output(start_time, network_data, registry_data, network_block_heights, run_stats)
+
+async def check_once(breaker, version_cache, http_cache, registry):
+    async with create_client(breaker, http_cache) as client:
+        return await run_check(client, breaker, version_cache, http_cache, registry)
+
+def main():
+    with run_report.stage("load_state"):
+        breaker = CircuitBreaker(load_state(CIRCUIT_BREAKER_PATH), CIRCUIT_BREAKER_THRESHOLD, CIRCUIT_BREAKER_PROBE_POLICY)
+        version_cache = BundleVersionCache(load_state(VERSION_CACHE_PATH))
+        http_cache = ConditionalCache(load_state(HTTP_CACHE_PATH))
+        registry = load_registry()
+    with run_report.stage("sweep") as counters:
+        output_data = asyncio.run(check_once(breaker, version_cache, http_cache, registry))
+        counters["interfaces"] = sum(len(network["interface"]) for network in output_data["networks"])
+        counters["http_requests"] = output_data["run_stats"]["http_pool"]["requests"]
+    with run_report.stage("save_state"):
+        save_state(breaker.history, CIRCUIT_BREAKER_PATH)
+        save_state(version_cache.entries, VERSION_CACHE_PATH)
+        save_state(http_cache.snapshot(), HTTP_CACHE_PATH)
+    print_summary(output_data["run_stats"])
+    with run_report.stage("write_output"):
+        write_output(output_data)
+
+if __name__ == "__main__":
+    with run_report.run("interfaces_check"):
+        main()
@@ -1,16 +1,32 @@
 #!/usr/bin/env python3
 
 import json
+import math
 import os
 from datetime import datetime, timezone
 from typing import Dict, List, Any, Optional, Tuple
 
+import change_log
+import change_store
+import run_report
+import sql_export
+
 # POSIX paths for GitHub Actions/Ubuntu
 BASE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 INTERFACE_STATUS_PATH = os.path.join(BASE_PATH, "interface-status.json")
 STATE_PATH = os.path.join(BASE_PATH, "state.json")
-CHANGES_JSON_PATH = os.path.join(BASE_PATH, "changes.json")
+CHANGES_LOG_PATH = os.path.join(BASE_PATH, "changes.jsonl")
+CHANGES_JSON_PATH = os.path.join(BASE_PATH, "changes.json")  # legacy format, converted into the log on first append
 CHANGES_SQL_PATH = os.path.join(BASE_PATH, "changes.sql")
+CHANGES_DB_PATH = os.path.join(BASE_PATH, "changes.db")
+
+# Also append each run's rows to changes.sql as one transaction of multi-row INSERTs; changes.db is the queryable store either way
+WRITE_SQL_DUMPS = False
+LATENCY_STATS_PATH = os.path.join(BASE_PATH, "latency_stats.json")
+
+# Probe latencies kept per team/service for the rolling percentiles, one per fresh probe
+# (96 probes = 48h at one run every 30 minutes; cached results in daemon.py are not sampled again)
+LATENCY_WINDOW = 96
 
 # Set which networks to track. Example: ["namada"] or ["namada", "housefire"]
 TRACKED_NETWORKS = ["namada"]  # Only mainnet by default
@@ -20,9 +36,20 @@ IGNORED_FIELDS = {
     "latest_block_height",  # handled specially in settings
     "script_start_time",
     "script_end_time",
-    "reference_latest_block_height"
+    "reference_latest_block_height",
+    "run_stats",  # per-run diagnostics from interfaces_check.py
+    "registry",  # registry endpoint health, reported but not tracked per team
+    "timings",  # per-request latencies, different on every run
+    "n_peers",  # RPC peer count, fluctuates between runs
+    "latest_block_time",  # advances with every block
+    "avg_block_time",  # drifts slightly with every block
+    "probe_age_seconds",  # how old a scheduled probe result is, set by daemon.py
+    "seconds_behind"  # handled specially in settings
 }
 
+# Lag fields are only logged alongside a sync_state change
+LAG_FIELDS = {"latest_block_height", "seconds_behind"}
+
 def filter_networks(state: dict, networks: list) -> dict:
     if state and "networks" in state:
         filtered = [n for n in state["networks"] if n.get("network") in networks]
@@ -42,11 +69,6 @@ def save_json_file(data: dict, path: str) -> None:
     with open(path, 'w', encoding='utf-8') as f:
         json.dump(data, f, indent=4)
 
-def append_to_file(content: str, path: str) -> None:
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, 'a', encoding='utf-8') as f:
-        f.write(content)
-
 def get_change_info(path_parts: List[str], current_state: dict = None) -> Tuple[Optional[str], Optional[str], str]:
     team = None
     service = None
@@ -291,13 +313,13 @@ def detect_changes(old_state: dict, new_state: dict, path: List[str] = None, roo
                 new_service = new_services[service_name]
                 sync_state_changed = old_service.get("sync_state") != new_service.get("sync_state")
                 for field in set(old_service.keys()) | set(new_service.keys()):
-                    if field in IGNORED_FIELDS and field != "latest_block_height":
+                    if field in IGNORED_FIELDS and field not in LAG_FIELDS:
                         continue
                     old_value = old_service.get(field)
                     new_value = new_service.get(field)
                     if old_value != new_value:
-                        if field == "latest_block_height" and not sync_state_changed:
-                            continue  # Only log block height if sync_state also changed
+                        if field in LAG_FIELDS and not sync_state_changed:
+                            continue  # Only log block height and lag if sync_state also changed
                         field_path = path + ["service", service_name, field]
                         changes.append(create_change_record(
                             field_path,
@@ -328,39 +350,48 @@ def detect_changes(old_state: dict, new_state: dict, path: List[str] = None, roo
                     ))
     return changes
 
-def generate_sql_statement(change: dict, timestamp: str) -> str:
-    team_value = "'{}'".format(change['team']) if change['team'] else 'null'
-    service_value = "'{}'".format(change['service']) if change['service'] else 'null'
-    return (
-        "INSERT INTO interface_changes "
-        "(timestamp, team, service, field, full_path, change_type, old_value, new_value) "
-        "VALUES ('{}', {}, {}, '{}', '{}', '{}', '{}', '{}');\n"
-    ).format(
-        timestamp,
-        team_value,
-        service_value,
-        change['field'],
-        change['full_path'],
-        change['type'],
-        json.dumps(change['old_value']),
-        json.dumps(change['new_value'])
-    )
+def percentile(samples: List[float], pct: float) -> float:
+    # Nearest-rank percentile
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
 
-def main():
-    print("Starting interface tracker...")
-    print("Reading from: {}".format(INTERFACE_STATUS_PATH))
-    timestamp = datetime.now(timezone.utc).isoformat() + "Z"
-    current_state = load_json_file(INTERFACE_STATUS_PATH)
-    if not current_state:
-        print("Error: Could not load interface status")
-        return
-    previous_state = load_json_file(STATE_PATH)
-    is_initial = not previous_state
+def service_latency(service: dict) -> Optional[float]:
+    """Critical path of a service probe: its slowest request, for services that answered.
 
-    # Filter networks based on TRACKED_NETWORKS
-    current_state = filter_networks(current_state, TRACKED_NETWORKS)
-    previous_state = filter_networks(previous_state, TRACKED_NETWORKS) if previous_state else previous_state
+    Records served from an earlier probe (non-zero probe_age_seconds) carry
+    that probe's timings, which were already sampled when it ran.
+    """
+    timings = service.get("timings")
+    if service.get("status") != "up" or not isinstance(timings, dict) or service.get("probe_age_seconds"):
+        return None
+    totals = [t["total_ms"] for t in timings.values() if isinstance(t, dict) and t.get("total_ms") is not None]
+    return max(totals) if totals else None
 
+def update_latency_stats(current_state: dict, stats: dict) -> dict:
+    for network in current_state.get("networks", []):
+        network_stats = stats.setdefault(network.get("network"), {})
+        for interface in network.get("interface", []):
+            team_stats = network_stats.setdefault(interface.get("team"), {})
+            for service in interface.get("settings", []):
+                latency = service_latency(service)
+                if latency is None:
+                    continue
+                entry = team_stats.setdefault(service.get("service"), {"samples": []})
+                entry["samples"] = (entry["samples"] + [latency])[-LATENCY_WINDOW:]
+                entry["p50"] = percentile(entry["samples"], 50)
+                entry["p95"] = percentile(entry["samples"], 95)
+                entry["p99"] = percentile(entry["samples"], 99)
+    return stats
+
+def record_changes(current_state: dict, previous_state: dict, timestamp: str) -> int:
+    """Append the changes from previous_state to current_state to the change logs.
+
+    Both states are expected to be filtered to TRACKED_NETWORKS already; an
+    empty previous_state records the complete current state as the initial
+    entry. Returns the number of changes recorded.
+    """
+    is_initial = not previous_state
     if is_initial:
         print("Initial run detected - recording complete state")
         changes = [{
@@ -369,7 +400,9 @@ def main():
             "state": current_state
         }]
     else:
-        detected_changes = detect_changes(previous_state, current_state)
+        with run_report.stage("detect_changes") as counters:
+            detected_changes = detect_changes(previous_state, current_state)
+            counters["changes"] = len(detected_changes)
         if detected_changes:
             changes = [{
                 "timestamp": timestamp,
@@ -378,34 +411,54 @@ def main():
         else:
             changes = []
     if changes:
-        existing_changes = load_json_file(CHANGES_JSON_PATH)
-        if not isinstance(existing_changes, list):
-            existing_changes = []
-        existing_changes.extend(changes)
-        save_json_file(existing_changes, CHANGES_JSON_PATH)
-        print("Updated {}".format(CHANGES_JSON_PATH))
-        sql_statements = []
+        with run_report.stage("append_change_log") as counters:
+            change_log.ensure_log(CHANGES_LOG_PATH, CHANGES_JSON_PATH)
+            counters["log_bytes"] = change_log.append_records(changes, CHANGES_LOG_PATH)
+        print("Updated {}".format(CHANGES_LOG_PATH))
         if is_initial:
-            sql_statements.append(
-                "INSERT INTO interface_changes "
-                "(timestamp, team, service, field, full_path, change_type, old_value, new_value) "
-                "VALUES ('{}', null, null, 'root', 'root', 'initial', 'null', '{}');\n".format(
-                    timestamp,
-                    json.dumps(current_state)
-                )
-            )
+            rows = [change_store.initial_row(timestamp, current_state)]
         else:
-            for change in detected_changes:
-                sql_statements.append(generate_sql_statement(change, timestamp))
-        append_to_file("".join(sql_statements), CHANGES_SQL_PATH)
-        print("Updated {}".format(CHANGES_SQL_PATH))
+            rows = [change_store.change_row(change, timestamp) for change in detected_changes]
+        with run_report.stage("write_change_store") as counters:
+            with change_store.ChangeStore(CHANGES_DB_PATH, legacy_dumps=CHANGES_SQL_PATH) as store:
+                counters["rows"] = store.insert(rows)
+        print("Updated {}".format(CHANGES_DB_PATH))
+        if WRITE_SQL_DUMPS:
+            with run_report.stage("write_changes_sql") as counters:
+                counters["rows"] = sql_export.append_rows(rows, CHANGES_SQL_PATH, change_store.COLUMNS)
+            print("Updated {}".format(CHANGES_SQL_PATH))
         change_count = len(detected_changes) if not is_initial else 1
         print("Recorded {} changes at {}".format(change_count, timestamp))
     else:
+        change_count = 0
         print("No changes detected at {}".format(timestamp))
-    save_json_file(current_state, STATE_PATH)
+    return change_count
+
+def main():
+    print("Starting interface tracker...")
+    print("Reading from: {}".format(INTERFACE_STATUS_PATH))
+    timestamp = datetime.now(timezone.utc).isoformat() + "Z"
+    with run_report.stage("load"):
+        current_state = load_json_file(INTERFACE_STATUS_PATH)
+        if not current_state:
+            print("Error: Could not load interface status")
+            return
+        previous_state = load_json_file(STATE_PATH)
+
+    # Filter networks based on TRACKED_NETWORKS
+    current_state = filter_networks(current_state, TRACKED_NETWORKS)
+    previous_state = filter_networks(previous_state, TRACKED_NETWORKS) if previous_state else previous_state
+
+    run_report.count("changes", record_changes(current_state, previous_state, timestamp))
+    with run_report.stage("save_state"):
+        save_json_file(current_state, STATE_PATH)
     print("Updated {}".format(STATE_PATH))
+    with run_report.stage("latency_stats"):
+        latency_stats = update_latency_stats(current_state, load_json_file(LATENCY_STATS_PATH))
+        save_json_file(latency_stats, LATENCY_STATS_PATH)
+    print("Updated {}".format(LATENCY_STATS_PATH))
     print("Done!")
 
 if __name__ == "__main__":
-    main()
+    with run_report.run("interfaces_tracker"):
+        main()
@@ -4,12 +4,19 @@ Script to convert team-specific JSON files to CSV format.
 Tracks initial state and applies changes over time to create a timeline of field values.
 """
 
-import json
 import csv
 import os
 from typing import Dict, List, Any, Set
 from collections import defaultdict
-import glob
+
+import change_log
+import run_report
+
+# Paths
+BASE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEAM_DATA_PATH = os.path.join(BASE_PATH, "team-data")
+JSON_INPUT_PATH = os.path.join(TEAM_DATA_PATH, "json")
+CSV_OUTPUT_PATH = os.path.join(TEAM_DATA_PATH, "csv")
 
 def extract_initial_state(initial_entry: Dict[str, Any]) -> Dict[str, Any]:
     """Extract all field values from the initial state entry."""
@@ -120,8 +127,8 @@ def process_team_file(file_path: str, output_dir: str) -> None:
     print(f"Processing {team_name}...")
     
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        # The compacted JSON view followed by entries still pending in the team's .jsonl log
+        data = list(change_log.iter_team_entries(file_path))
         
         if not data:
             print(f"No data found in {file_path}")
@@ -199,12 +206,6 @@ def process_team_file(file_path: str, output_dir: str) -> None:
 
 def main():
     """Main function to process all team JSON files."""
-    # Paths
-    BASE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    TEAM_DATA_PATH = os.path.join(BASE_PATH, "team-data")
-    JSON_INPUT_PATH = os.path.join(TEAM_DATA_PATH, "json")
-    CSV_OUTPUT_PATH = os.path.join(TEAM_DATA_PATH, "csv")
-    
     print("Starting JSON to CSV conversion...")
     print(f"Reading from: {JSON_INPUT_PATH}")
     print(f"Writing to: {CSV_OUTPUT_PATH}")
@@ -212,9 +213,8 @@ def main():
     # Create CSV output directory
     os.makedirs(CSV_OUTPUT_PATH, exist_ok=True)
     
-    # Get all team JSON files
-    team_files = glob.glob(os.path.join(JSON_INPUT_PATH, '*.json'))
-    team_files = [f for f in team_files if not f.endswith('summary.json')]
+    # Get all team JSON files, including teams that so far only have pending entries
+    team_files = change_log.team_files(JSON_INPUT_PATH)
     
     if not team_files:
         print("No JSON files found to convert")
@@ -224,9 +224,14 @@ def main():
     
     # Process each team file
     for file_path in sorted(team_files):
-        process_team_file(file_path, CSV_OUTPUT_PATH)
+        with run_report.stage("convert_team_file"):
+            process_team_file(file_path, CSV_OUTPUT_PATH)
+            for path in (file_path, change_log.team_log_path(file_path)):
+                if os.path.exists(path):
+                    run_report.count("bytes_read", os.path.getsize(path))
     
     print(f"\nAll CSV files created in {CSV_OUTPUT_PATH}/ directory")
 
 if __name__ == "__main__":
-    main()
+    with run_report.run("json_to_csv"):
+        main()
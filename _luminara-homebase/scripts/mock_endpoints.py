@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for operator infrastructure, for measuring interfaces_check.py without real traffic.
+
+Serves an interfaces.json listing N Namadillo interfaces. Interface i lives under
+http://<host i>:<port>/i<i>/ with its index page, content-hashed JS bundle and
+config.toml, and its RPC (CometBFT status / abci_info / net_info, batched or not),
+indexer and MASP endpoints below it. Interfaces are spread over 127.x.y.z
+addresses, which all reach this server on Linux, so per-host connection limits
+behave as they would against separate operators.
+
+Usage: python3 mock_endpoints.py --interfaces 300 --latency 50 --failure-rate 0.02
+"""
+
+import argparse
+import asyncio
+import hashlib
+import random
+import time
+from aiohttp import web
+
+INTERFACE_VERSION = "1.32.1"
+COMETBFT_VERSION = "0.37.15"
+NAMADA_VERSION = "1.1.5"
+INDEXER_VERSION = "4.1.0"
+MASP_VERSION = "1.4.7"
+BLOCK_TIME_SECONDS = 6
+GENESIS_HEIGHT = 1000000
+
+def interface_host(i, single_host=False):
+    if single_host:
+        return "127.0.0.1"
+    # Starts at 127.0.0.2, so the listing on 127.0.0.1 never shares a connection pool with an interface
+    n = i + 1
+    return f"127.{n // 62500 % 250}.{n // 250 % 250}.{n % 250 + 1}"
+
+class MockEndpoints:
+    def __init__(self, interfaces, port, latency_ms, jitter_ms, failure_rate, bundle_size, lag_blocks, single_host, seed):
+        self.interfaces = interfaces
+        self.port = port
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.failure_rate = failure_rate
+        self.bundle_size = bundle_size
+        self.lag_blocks = lag_blocks
+        self.single_host = single_host
+        self.random = random.Random(seed)
+        self.started = time.time()
+        self.requests = 0
+
+    def base_url(self, i):
+        return f"http://{interface_host(i, self.single_host)}:{self.port}/i{i}"
+
+    def height(self, i):
+        # Every tenth node lags behind the chain tip
+        lag = self.lag_blocks if i % 10 == 9 else 0
+        return GENESIS_HEIGHT + int((time.time() - self.started) / BLOCK_TIME_SECONDS) - lag
+
+    def block_time(self, height):
+        # Blocks come every BLOCK_TIME_SECONDS from GENESIS_HEIGHT at startup, so a lagging node's last block is old too
+        return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.started + (height - GENESIS_HEIGHT) * BLOCK_TIME_SECONDS))
+
+    def bundle_name(self, i):
+        return "index-" + hashlib.sha1(f"{i}-{INTERFACE_VERSION}".encode()).hexdigest()[:8] + ".js"
+
+    def bundle(self):
+        marker = f'const version$1 = "{INTERFACE_VERSION}";'
+        filler = max(self.bundle_size - len(marker), 0)
+        return "x" * (filler // 2) + marker + "y" * (filler - filler // 2)
+
+    def interface_list(self):
+        return [{
+            "Team or Contributor Name": f"team-{i}",
+            "Discord UserName": f"operator{i}",
+            "Interface Name (Namadillo or Custom)": "Namadillo",
+            "Interface URL": self.base_url(i)
+        } for i in range(self.interfaces)]
+
+    def rpc_result(self, i, method):
+        if method == "status":
+            height = self.height(i)
+            return {
+                "node_info": {"version": COMETBFT_VERSION, "moniker": f"node-{i}-v{NAMADA_VERSION}"},
+                "sync_info": {
+                    "latest_block_height": str(height),
+                    "latest_block_time": self.block_time(height),
+                    "earliest_block_height": str(GENESIS_HEIGHT - 14400),
+                    "earliest_block_time": self.block_time(GENESIS_HEIGHT - 14400)
+                }
+            }
+        if method == "abci_info":
+            return {"response": {"version": NAMADA_VERSION, "app_version": "1"}}
+        if method == "net_info":
+            return {"n_peers": str(10 + i % 40)}
+        return None
+
+    async def handle(self, request):
+        self.requests += 1
+        await asyncio.sleep(max(self.latency + self.random.uniform(-self.jitter, self.jitter), 0))
+        path = request.path
+        if path == "/interfaces.json":
+            return web.json_response(self.interface_list())
+        if path == "/stats":
+            return web.json_response({"requests": self.requests})
+        if self.random.random() < self.failure_rate:
+            return web.Response(status=503)
+        parts = path.split("/", 2)
+        if not parts[1].startswith("i") or not parts[1][1:].isdigit():
+            return web.Response(status=404)
+        i = int(parts[1][1:])
+        rest = "/" + parts[2] if len(parts) > 2 else "/"
+        if rest == "/":
+            return web.Response(
+                text=f'<!doctype html><html><head><script type="module" crossorigin src="/assets/{self.bundle_name(i)}"></script></head><body></body></html>',
+                content_type="text/html"
+            )
+        if rest.startswith("/assets/"):
+            return web.Response(text=self.bundle(), content_type="application/javascript")
+        if rest == "/config.toml":
+            base = self.base_url(i)
+            return web.Response(text=f'rpc_url = "{base}/rpc"\nindexer_url = "{base}/indexer"\nmasp_indexer_url = "{base}/masp"\n')
+        if rest.rstrip("/") == "/rpc" and request.method == "POST":
+            batch = await request.json()
+            return web.json_response([
+                {"jsonrpc": "2.0", "id": call.get("id"), "result": self.rpc_result(i, call.get("method"))}
+                for call in batch
+            ])
+        if rest.startswith("/rpc/"):
+            result = self.rpc_result(i, rest[len("/rpc/"):])
+            if result is None:
+                return web.Response(status=404)
+            return web.json_response({"jsonrpc": "2.0", "id": -1, "result": result})
+        if rest == "/indexer/api/v1/chain/block/latest":
+            return web.json_response({"block_height": str(self.height(i) - 2)})
+        if rest == "/masp/api/v1/height":
+            return web.json_response({"block": self.height(i) - 3})
+        if rest == "/indexer/health":
+            return web.json_response({"version": INDEXER_VERSION})
+        if rest == "/masp/health":
+            return web.json_response({"version": MASP_VERSION})
+        return web.Response(status=404)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve simulated Namadillo interfaces and their services.")
+    parser.add_argument("--interfaces", type=int, default=30, help="number of interfaces to list")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--latency", type=float, default=50, help="response delay in milliseconds")
+    parser.add_argument("--jitter", type=float, default=10, help="random +/- variation of the delay in milliseconds")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of requests answered with 503")
+    parser.add_argument("--bundle-size", type=int, default=2 * 1024 * 1024, help="JS bundle size in bytes")
+    parser.add_argument("--lag-blocks", type=int, default=100, help="how far every tenth node trails the tip")
+    parser.add_argument("--single-host", action="store_true", help="serve every interface from 127.0.0.1 (non-Linux hosts)")
+    parser.add_argument("--seed", type=int, default=1)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    mock = MockEndpoints(
+        args.interfaces, args.port, args.latency, args.jitter, args.failure_rate,
+        args.bundle_size, args.lag_blocks, args.single_host, args.seed
+    )
+    app = web.Application()
+    app.router.add_route("*", "/{tail:.*}", mock.handle)
+    print(f"Serving {args.interfaces} interfaces on port {args.port}, list at http://127.0.0.1:{args.port}/interfaces.json", flush=True)
+    web.run_app(app, host="0.0.0.0", port=args.port, print=None)
+
+if __name__ == "__main__":
+    main()
@@ -7,13 +7,19 @@ from collections import defaultdict
 from datetime import datetime
 from typing import Dict, List, Any, Set
 
+import change_log
+import change_store
+
 # Paths
 BASE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-CHANGES_JSON_PATH = os.path.join(BASE_PATH, "changes.json")
+CHANGES_LOG_PATH = os.path.join(BASE_PATH, "changes.jsonl")
+CHANGES_JSON_PATH = os.path.join(BASE_PATH, "changes.json")  # legacy format
 CHANGES_SQL_PATH = os.path.join(BASE_PATH, "changes.sql")
+CHANGES_DB_PATH = os.path.join(BASE_PATH, "changes.db")
 TEAM_DATA_PATH = os.path.join(BASE_PATH, "team-data")
 JSON_OUTPUT_PATH = os.path.join(TEAM_DATA_PATH, "json")
 SQL_OUTPUT_PATH = os.path.join(TEAM_DATA_PATH, "sql")
+TEAM_CHANGES_DB_PATH = os.path.join(TEAM_DATA_PATH, "changes.db")
 
 def load_json_file(path: str) -> List[Dict[str, Any]]:
     """Load JSON file and return as list."""
@@ -150,15 +156,15 @@ def parse_sql_by_team(sql_file_path: str) -> Dict[str, List[str]]:
 
 def main():
     print("Starting team data parsing...")
-    print(f"Reading from: {CHANGES_JSON_PATH}")
+    print(f"Reading from: {change_log.history_path(CHANGES_LOG_PATH, CHANGES_JSON_PATH) or CHANGES_LOG_PATH}")
     
     # Load changes data
-    changes_data = load_json_file(CHANGES_JSON_PATH)
+    changes_data = list(change_log.iter_changes(CHANGES_LOG_PATH, CHANGES_JSON_PATH))
     if not changes_data:
-        print("Error: Could not load changes.json")
+        print("Error: Could not load the change history")
         return
     
-    print(f"Loaded {len(changes_data)} entries from changes.json")
+    print(f"Loaded {len(changes_data)} entries from the change history")
     
     # Extract all teams
     teams = extract_teams_from_changes(changes_data)
@@ -168,9 +174,14 @@ def main():
     team_changes = parse_changes_by_team(changes_data)
     print(f"Parsed changes for {len(team_changes)} teams")
     
-    # Parse SQL by team
-    team_sql = parse_sql_by_team(CHANGES_SQL_PATH)
-    print(f"Parsed SQL for {len(team_sql)} teams")
+    # Rebuild the team database from the same full history as the JSON views
+    written = change_store.rebuild_team_store(changes_data, TEAM_CHANGES_DB_PATH, SQL_OUTPUT_PATH)
+    print(f"Wrote {written} rows to {TEAM_CHANGES_DB_PATH}")
+    # Before changes.db existed, changes.sql was still being written; split it by team as well
+    team_sql = {}
+    if not os.path.exists(CHANGES_DB_PATH):
+        team_sql = parse_sql_by_team(CHANGES_SQL_PATH)
+        print(f"Parsed SQL for {len(team_sql)} teams")
     
     # Save team-specific JSON files
     for team, data in team_changes.items():
@@ -181,6 +192,9 @@ def main():
             safe_team_name = re.sub(r'[^\w\-]', '_', team)
         json_path = os.path.join(JSON_OUTPUT_PATH, f"{safe_team_name}.json")
         save_json_file(data, json_path)
+        # The rebuilt view already holds everything the pending log had
+        if os.path.exists(change_log.team_log_path(json_path)):
+            os.remove(change_log.team_log_path(json_path))
         print(f"Saved {len(data)} entries to {json_path}")
     
     # Save team-specific SQL files
@@ -194,7 +208,8 @@ def main():
         
         os.makedirs(os.path.dirname(sql_path), exist_ok=True)
         with open(sql_path, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(statements))
+            # End with a newline so later appends start a line of their own
+            f.write('\n'.join(statements) + '\n')
         
         print(f"Saved {len(statements)} SQL statements to {sql_path}")
     
@@ -0,0 +1,328 @@
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+import aiohttp
+
+# Statuses worth another attempt; other 4xx answers will not change within a sweep
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+class DeadlineExceeded(Exception):
+    pass
+
+@dataclass
+class RetryPolicy:
+    """Exponential backoff with full jitter, never sleeping after the last attempt."""
+    attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 4.0
+    timeout: float = 5
+
+    def delay(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+def is_retryable(error):
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status in RETRYABLE_STATUSES
+    if isinstance(error, aiohttp.ClientConnectorError):
+        # Refused connections, DNS and certificate failures will not recover within a sweep
+        return False
+    return isinstance(error, (asyncio.TimeoutError, aiohttp.ClientPayloadError, aiohttp.ClientOSError, aiohttp.ServerDisconnectedError))
+
+def is_rejection(error):
+    # The server answered but refused the request itself, e.g. a proxy that does not allow POST
+    return isinstance(error, aiohttp.ClientResponseError) and 400 <= error.status < 500
+
+async def read_text(response):
+    return (await response.read()).decode("utf-8")
+
+def counts_as_host_failure(error):
+    # Any HTTP answer below 500 proves the host is reachable, even an error page
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status >= 500
+    return not isinstance(error, DeadlineExceeded)
+
+class CircuitBreaker:
+    """Per-host failure history carried from one run to the next.
+
+    A host that failed every request for `threshold` consecutive runs is open:
+    each request to it gets the single short-timeout probe_policy instead of
+    the full retry ladder. The first successful answer closes it again, both
+    for the rest of the run and in the persisted history.
+    """
+
+    def __init__(self, history=None, threshold=2, probe_policy=None):
+        # host -> {"consecutive_failures": runs, "failing_since": timestamp}; healthy hosts are not stored
+        self.history = dict(history or {})
+        self.threshold = threshold
+        self.probe_policy = probe_policy or RetryPolicy(attempts=1, timeout=2)
+        self._outcomes = {}
+        self.short_circuited = 0
+        self.recovered = []
+
+    def is_open(self, host):
+        if self._outcomes.get(host):
+            return False
+        return self.history.get(host, {}).get("consecutive_failures", 0) >= self.threshold
+
+    def record(self, host, ok):
+        self._outcomes[host] = self._outcomes.get(host, False) or ok
+
+    def policy_for(self, host, policy):
+        if self.is_open(host):
+            self.short_circuited += 1
+            return self.probe_policy
+        return policy
+
+    def end_run(self, timestamp):
+        """Fold this run's outcomes into the history and return it for persisting."""
+        for host, ok in self._outcomes.items():
+            if ok:
+                if host in self.history:
+                    self.recovered.append(host)
+                    del self.history[host]
+                continue
+            entry = self.history.setdefault(host, {"consecutive_failures": 0, "failing_since": timestamp})
+            entry["consecutive_failures"] += 1
+        self.recovered.sort()
+        self.history = dict(sorted(self.history.items()))
+        return self.history
+
+    def summary(self):
+        return {
+            "open_hosts": sum(1 for entry in self.history.values() if entry["consecutive_failures"] >= self.threshold),
+            "short_circuited_requests": self.short_circuited,
+            "recovered_hosts": self.recovered
+        }
+
+class ConditionalCache:
+    """Validators and bodies of previously fetched documents, kept between runs.
+
+    Requests carry If-None-Match / If-Modified-Since, and a 304 answer is
+    served from the stored body, so unchanged documents cost no transfer.
+    """
+
+    def __init__(self, entries=None):
+        # url -> {"etag": ..., "last_modified": ..., "body": text}
+        self.entries = dict(entries or {})
+        self.requested = set()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    def request_headers(self, url):
+        self.requested.add(url)
+        entry = self.entries.get(url, {})
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    async def read(self, url, response):
+        if response.status == 304 and url in self.entries:
+            self.hits += 1
+            body = self.entries[url]["body"]
+            self.bytes_saved += len(body.encode("utf-8"))
+            return body
+        body = (await response.read()).decode("utf-8")
+        self.misses += 1
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            self.entries[url] = {"etag": etag, "last_modified": last_modified, "body": body}
+        else:
+            self.entries.pop(url, None)
+        return body
+
+    def snapshot(self):
+        """Entries for the documents requested in this run, for persisting."""
+        return {url: self.entries[url] for url in sorted(self.requested) if url in self.entries}
+
+    def summary(self):
+        return {"not_modified": self.hits, "downloaded": self.misses, "bytes_saved": self.bytes_saved}
+
+class RequestTiming:
+    """Connection phases of a request's latest attempt, filled in by the client's trace hooks."""
+
+    def __init__(self):
+        self.marks = {}
+
+    def mark(self, name):
+        if name == "request_start":
+            self.marks = {}
+        self.marks[name] = time.perf_counter()
+
+    def span_ms(self, start, end):
+        if start in self.marks and end in self.marks:
+            return round((self.marks[end] - self.marks[start]) * 1000, 1)
+        return 0.0
+
+    def phases(self):
+        dns_ms = self.span_ms("dns_start", "dns_end")
+        return {
+            "queued_ms": self.span_ms("queue_start", "queue_end"),
+            "dns_ms": dns_ms,
+            # aiohttp resolves, connects and completes the TLS handshake in one step,
+            # so connect_ms covers TCP and TLS together
+            "connect_ms": round(max(self.span_ms("connect_start", "connect_end") - dns_ms, 0.0), 1),
+            "ttfb_ms": self.span_ms("request_start", "request_end"),
+            "reused": "connection_reused" in self.marks
+        }
+
+class ProbeClient:
+    """Pooled HTTP client shared by every request of a sweep.
+
+    A single connector keeps connections alive per host, so the index page,
+    JS bundle, config.toml and service endpoints of one operator reuse the
+    same TCP connection and TLS session instead of handshaking again.
+    Resolved addresses are cached for the lifetime of the client.
+    """
+
+    def __init__(self, limit=64, limit_per_host=6, headers=None, ssl_context=None, keepalive_timeout=60, dns_ttl=None,
+                 retry_policy=None, deadline=None, breaker=None, http_cache=None):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.headers = headers or {}
+        self.ssl_context = ssl_context
+        self.keepalive_timeout = keepalive_timeout
+        # None keeps DNS answers until the client is closed
+        self.dns_ttl = dns_ttl
+        self.retry_policy = retry_policy or RetryPolicy()
+        # Seconds the whole sweep may take; requests after that fail immediately
+        self.deadline = deadline
+        self._deadline_at = None
+        self.breaker = breaker
+        self.http_cache = http_cache
+        self.stats = {
+            "requests": 0,
+            "connections_opened": 0,
+            "connections_reused": 0,
+            "dns_cache_hits": 0,
+            "dns_cache_misses": 0,
+            "retries": 0,
+            "deadline_skipped": 0
+        }
+        self._session = None
+
+    async def __aenter__(self):
+        self.start_sweep()
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(self._counter("requests"))
+        trace_config.on_connection_create_end.append(self._counter("connections_opened"))
+        trace_config.on_connection_reuseconn.append(self._counter("connections_reused"))
+        trace_config.on_dns_cache_hit.append(self._counter("dns_cache_hits"))
+        trace_config.on_dns_cache_miss.append(self._counter("dns_cache_misses"))
+        for signal, name in (
+            (trace_config.on_request_start, "request_start"),
+            (trace_config.on_connection_queued_start, "queue_start"),
+            (trace_config.on_connection_queued_end, "queue_end"),
+            (trace_config.on_connection_create_start, "connect_start"),
+            (trace_config.on_connection_create_end, "connect_end"),
+            (trace_config.on_connection_reuseconn, "connection_reused"),
+            (trace_config.on_dns_resolvehost_start, "dns_start"),
+            (trace_config.on_dns_resolvehost_end, "dns_end"),
+            (trace_config.on_request_end, "request_end")
+        ):
+            signal.append(self._marker(name))
+        # The connector enforces the global and per-host limits; requests beyond them queue for a free slot
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            ssl=self.ssl_context if self.ssl_context is not None else True,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=self.dns_ttl
+        )
+        self._session = aiohttp.ClientSession(connector=connector, headers=self.headers, trace_configs=[trace_config])
+        return self
+
+    def start_sweep(self):
+        """Reset the counters and restart the deadline, for a client reused across sweeps."""
+        for key in self.stats:
+            self.stats[key] = 0
+        if self.deadline is not None:
+            self._deadline_at = time.monotonic() + self.deadline
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _counter(self, key):
+        async def handler(session, trace_config_ctx, params):
+            self.stats[key] += 1
+        return handler
+
+    def _marker(self, name):
+        async def handler(session, trace_config_ctx, params):
+            if isinstance(trace_config_ctx.trace_request_ctx, RequestTiming):
+                trace_config_ctx.trace_request_ctx.mark(name)
+        return handler
+
+    def remaining(self):
+        if self._deadline_at is None:
+            return float("inf")
+        return self._deadline_at - time.monotonic()
+
+    def request(self, method, url, timeout=5, headers=None, timing=None, json=None):
+        # Per socket operation like urllib, so time spent queued for a slot does not count;
+        # the total is only capped by what is left of the sweep deadline
+        remaining = self.remaining()
+        total = remaining if remaining != float("inf") else None
+        client_timeout = aiohttp.ClientTimeout(total=total, sock_connect=timeout, sock_read=timeout)
+        return self._session.request(method, url, timeout=client_timeout, headers=headers, trace_request_ctx=timing, json=json)
+
+    def get(self, url, timeout=5, headers=None, timing=None):
+        return self.request("GET", url, timeout, headers, timing)
+
+    async def fetch(self, url, read, policy=None, headers=None, timing=None, method="GET", json=None):
+        """Return read(response) for url, retrying retryable failures under policy.
+
+        The last error is re-raised once attempts run out, the error is not
+        retryable, or the next backoff would overrun the sweep deadline.
+        A RequestTiming passed as timing receives the phases of the last attempt.
+        Only pass a json body for requests that are safe to repeat.
+        """
+        policy = policy or self.retry_policy
+        host = urlsplit(url).hostname
+        if self.breaker is not None:
+            policy = self.breaker.policy_for(host, policy)
+        for attempt in range(policy.attempts):
+            if self.remaining() <= 0:
+                self.stats["deadline_skipped"] += 1
+                raise DeadlineExceeded("sweep deadline reached")
+            try:
+                async with self.request(method, url, policy.timeout, headers, timing, json) as response:
+                    if self.breaker is not None:
+                        self.breaker.record(host, response.status < 500)
+                    response.raise_for_status()
+                    return await read(response)
+            except Exception as e:
+                if self.breaker is not None and counts_as_host_failure(e):
+                    self.breaker.record(host, False)
+                if attempt == policy.attempts - 1 or not is_retryable(e):
+                    raise
+                delay = policy.delay(attempt)
+                if delay >= self.remaining():
+                    raise
+                self.stats["retries"] += 1
+                await asyncio.sleep(delay)
+
+    async def fetch_conditional(self, url, policy=None):
+        """Fetch url as text, revalidating against the conditional cache when there is one."""
+        if self.http_cache is None:
+            return await self.fetch(url, read_text, policy)
+        async def read(response):
+            return await self.http_cache.read(url, response)
+        return await self.fetch(url, read, policy, headers=self.http_cache.request_headers(url))
+
+    def pool_stats(self):
+        stats = dict(self.stats)
+        connections = stats["connections_opened"] + stats["connections_reused"]
+        stats["connection_reuse_ratio"] = round(stats["connections_reused"] / connections, 3) if connections else 0.0
+        return stats
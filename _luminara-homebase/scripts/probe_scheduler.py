@@ -0,0 +1,80 @@
+import time
+from collections import Counter
+
+class ProbeScheduler:
+    """Per-endpoint probe intervals for a process that sweeps repeatedly.
+
+    Every endpoint starts at min_interval. Once its last `window` assessments
+    were all healthy (up and sync_ok), each further healthy one doubles its
+    interval up to max_interval; any other outcome drops it straight back to
+    min_interval. Endpoints that are not due are answered from their last
+    probe, with the age of that probe.
+    """
+
+    def __init__(self, min_interval=60, max_interval=900, window=5):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.window = window
+        # key -> {"result", "probed_at", "interval", "history", "assessments": {network: {...}}}
+        self.endpoints = {}
+        self.probed = 0
+        self.served_from_cache = 0
+        self._observed = set()
+        self._sweep_started = time.monotonic()
+
+    def start_sweep(self):
+        self.probed = 0
+        self.served_from_cache = 0
+        self._observed = set()
+        # Ages are measured between sweep starts, so how long a probe took does not shift its schedule
+        self._sweep_started = time.monotonic()
+
+    def cached(self, key):
+        """Last result for key with its probe_age_seconds, or None when the endpoint is due."""
+        entry = self.endpoints.get(key)
+        if entry is None:
+            return None
+        age = self._sweep_started - entry["probed_at"]
+        # Sweeps never start exactly one interval apart, so allow a little slack
+        if age >= entry["interval"] * 0.9:
+            return None
+        self.served_from_cache += 1
+        return {**entry["result"], "probe_age_seconds": round(age)}
+
+    def store(self, key, result):
+        self.probed += 1
+        entry = self.endpoints.setdefault(key, {"interval": self.min_interval, "history": [], "assessments": {}})
+        entry["result"] = result
+        entry["probed_at"] = self._sweep_started
+
+    def assessment(self, network, key):
+        entry = self.endpoints.get(key)
+        return entry["assessments"].get(network) if entry else None
+
+    def observe(self, network, key, service_data):
+        """Fold a freshly probed and assessed record into the endpoint's interval."""
+        entry = self.endpoints.get(key)
+        if entry is None:
+            return
+        entry["assessments"][network] = {
+            "sync_state": service_data.get("sync_state"),
+            "seconds_behind": service_data.get("seconds_behind", "n/a")
+        }
+        # Endpoints shared by several interfaces count once per sweep
+        if key in self._observed:
+            return
+        self._observed.add(key)
+        outcome = (service_data.get("status"), service_data.get("sync_state"))
+        entry["history"] = (entry["history"] + [outcome])[-self.window:]
+        if len(entry["history"]) == self.window and set(entry["history"]) == {("up", "sync_ok")}:
+            entry["interval"] = min(entry["interval"] * 2, self.max_interval)
+        else:
+            entry["interval"] = self.min_interval
+
+    def summary(self):
+        return {
+            "tracked_endpoints": len(self.endpoints),
+            "probed": self.probed,
+            "served_from_cache": self.served_from_cache,
+            "intervals": dict(sorted(Counter(entry["interval"] for entry in self.endpoints.values()).items()))
+        }
@@ -0,0 +1,162 @@
+"""
+Stage timings for the pipeline scripts, written out as a JSON run report.
+
+A script runs its main() inside run(), which writes
+run-reports/<script>.json when it returns: total and per-stage wall and CPU
+time, per-stage counters, peak memory and whether the run raised. Stages
+nest, and are keyed by their path ("sweep/assess"); a stage entered several
+times accumulates its calls, times and counters. stage() and count() do
+nothing outside run(), so shared functions can be instrumented and still be
+called from daemon.py without producing reports.
+
+Set LUMINARA_PROFILE to a comma-separated list of stage names, or "all", to
+run those stages under cProfile. The raw stats are saved next to the report
+as <script>.<stage>.prof and the slowest functions are listed in the report.
+"""
+
+import cProfile
+import json
+import os
+import pstats
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+BASE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORTS_PATH = os.path.join(BASE_PATH, "run-reports")
+PROFILE_ENV_VAR = "LUMINARA_PROFILE"
+# Functions listed per profiled stage, by cumulative time
+PROFILE_TOP_FUNCTIONS = 20
+
+class RunReport:
+    def __init__(self, script: str, profile_stages: Optional[List[str]] = None):
+        self.script = script
+        self.profile_stages = set(profile_stages or [])
+        self.started_at = datetime.now(timezone.utc).isoformat() + "Z"
+        self.started = time.perf_counter()
+        self.started_cpu = time.process_time()
+        self.stages = {}  # type: Dict[str, Dict[str, Any]]
+        self.counters = {}  # type: Dict[str, int]
+        self.profiles = {}  # type: Dict[str, cProfile.Profile]
+        self._stack = []  # type: List[str]
+        self._profiling = False
+
+    def wants_profile(self, name: str) -> bool:
+        return "all" in self.profile_stages or name in self.profile_stages
+
+    @contextmanager
+    def stage(self, name: str):
+        key = "/".join(self._stack + [name])
+        entry = self.stages.setdefault(key, {"calls": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0, "counters": {}})
+        # Only one profiler can be active at a time, so nested stages run inside their parent's profile
+        profiler = None
+        if self.wants_profile(name) and not self._profiling:
+            profiler = self.profiles.setdefault(key, cProfile.Profile())
+            self._profiling = True
+        self._stack.append(name)
+        started = time.perf_counter()
+        started_cpu = time.process_time()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield entry["counters"]
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                self._profiling = False
+            entry["calls"] += 1
+            entry["wall_seconds"] += time.perf_counter() - started
+            entry["cpu_seconds"] += time.process_time() - started_cpu
+            self._stack.pop()
+
+    def count(self, name: str, n: int = 1) -> None:
+        counters = self.stages["/".join(self._stack)]["counters"] if self._stack else self.counters
+        counters[name] = counters.get(name, 0) + n
+
+    def profile_summary(self, key: str, profiler: cProfile.Profile) -> Dict[str, Any]:
+        path = os.path.join(REPORTS_PATH, "{}.{}.prof".format(self.script, key.replace("/", ".")))
+        profiler.dump_stats(path)
+        stats = pstats.Stats(profiler).stats
+        top = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:PROFILE_TOP_FUNCTIONS]
+        return {
+            "path": os.path.relpath(path, BASE_PATH),
+            "top_functions": [{
+                "function": "{}:{}({})".format(os.path.basename(filename), line, function),
+                "calls": calls,
+                "total_seconds": round(total, 6),
+                "cumulative_seconds": round(cumulative, 6)
+            } for (filename, line, function), (_, calls, total, cumulative, _) in top]
+        }
+
+    def to_dict(self, error: Optional[BaseException] = None) -> Dict[str, Any]:
+        stages = {}
+        for key, entry in self.stages.items():
+            stages[key] = dict(entry, wall_seconds=round(entry["wall_seconds"], 6), cpu_seconds=round(entry["cpu_seconds"], 6))
+        for key, profiler in self.profiles.items():
+            stages[key]["profile"] = self.profile_summary(key, profiler)
+        return {
+            "script": self.script,
+            "started_at": self.started_at,
+            "finished_at": datetime.now(timezone.utc).isoformat() + "Z",
+            "python": sys.version.split()[0],
+            "status": "ok" if error is None else "error",
+            "error": None if error is None else "{}: {}".format(type(error).__name__, error),
+            "wall_seconds": round(time.perf_counter() - self.started, 6),
+            "cpu_seconds": round(time.process_time() - self.started_cpu, 6),
+            # ru_maxrss is in kilobytes on Linux
+            "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None,
+            "counters": self.counters,
+            "stages": stages
+        }
+
+    def write(self, error: Optional[BaseException] = None) -> str:
+        os.makedirs(REPORTS_PATH, exist_ok=True)
+        path = os.path.join(REPORTS_PATH, "{}.json".format(self.script))
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(error), f, indent=4)
+        return path
+
+_active = None  # type: Optional[RunReport]
+
+def profile_stages_from_env() -> List[str]:
+    return [name.strip() for name in os.environ.get(PROFILE_ENV_VAR, "").split(",") if name.strip()]
+
+@contextmanager
+def run(script: str):
+    """Collect a report for the enclosed run and write it when the run ends, even if it raised."""
+    global _active
+    report = RunReport(script, profile_stages_from_env())
+    _active = report
+    error = None
+    try:
+        yield report
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _active = None
+        try:
+            print("Run report written to {}".format(report.write(error)))
+        except OSError as e:
+            print("Error writing run report: {}".format(e))
+
+@contextmanager
+def stage(name: str):
+    """Time the enclosed block as a stage of the active run; yields its counters dict."""
+    if _active is None:
+        yield {}
+        return
+    with _active.stage(name) as counters:
+        yield counters
+
+def count(name: str, n: int = 1) -> None:
+    """Add n to a counter of the innermost running stage, or of the run itself."""
+    if _active is not None:
+        _active.count(name, n)
@@ -0,0 +1,108 @@
+"""
+SQL text for interface_changes rows, for loading into SQLite or PostgreSQL.
+
+Two formats, both wrapped in a transaction:
+
+- "insert": multi-row INSERT statements of up to INSERT_BATCH_SIZE rows,
+  with string literals quoted by doubling single quotes, which both SQLite
+  and PostgreSQL (standard_conforming_strings, the default) accept.
+- "copy": a PostgreSQL COPY ... FROM stdin block in text format, the
+  fastest way to load into PostgreSQL with psql.
+
+Rows are tuples in the order of the columns passed in, normally
+change_store.COLUMNS.
+"""
+
+import math
+import os
+from typing import Any, Iterable, Iterator, List, Sequence, TextIO
+
+TABLE = "interface_changes"
+INSERT_BATCH_SIZE = 500
+FORMATS = ("insert", "copy")
+
+def sql_literal(value: Any) -> str:
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, int) or (isinstance(value, float) and math.isfinite(value)):
+        return repr(value)
+    return "'{}'".format(str(value).replace("'", "''"))
+
+def copy_field(value: Any) -> str:
+    # COPY text format: \N is NULL, and backslash, tab, newline and carriage return are backslash-escaped
+    if value is None:
+        return "\\N"
+    return (str(value)
+            .replace("\\", "\\\\")
+            .replace("\t", "\\t")
+            .replace("\n", "\\n")
+            .replace("\r", "\\r"))
+
+def copy_line(row: Sequence[Any]) -> str:
+    return "\t".join(copy_field(value) for value in row) + "\n"
+
+def batches(rows: Iterable[Sequence[Any]], size: int) -> Iterator[List[Sequence[Any]]]:
+    batch = []  # type: List[Sequence[Any]]
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def insert_statement(rows: List[Sequence[Any]], columns: Sequence[str]) -> str:
+    values = ",\n".join("({})".format(", ".join(sql_literal(value) for value in row)) for row in rows)
+    return "INSERT INTO {} ({}) VALUES\n{};\n".format(TABLE, ", ".join(columns), values)
+
+def write_inserts(rows: Iterable[Sequence[Any]], f: TextIO, columns: Sequence[str], batch_size: int = INSERT_BATCH_SIZE) -> int:
+    """Write rows as one transaction of multi-row INSERTs; returns the rows written."""
+    count = 0
+    f.write("BEGIN;\n")
+    for batch in batches(rows, batch_size):
+        f.write(insert_statement(batch, columns))
+        count += len(batch)
+    f.write("COMMIT;\n")
+    return count
+
+def write_copy(rows: Iterable[Sequence[Any]], f: TextIO, columns: Sequence[str]) -> int:
+    """Write rows as one transaction holding a COPY FROM stdin block; returns the rows written."""
+    count = 0
+    f.write("BEGIN;\n")
+    f.write("COPY {} ({}) FROM stdin;\n".format(TABLE, ", ".join(columns)))
+    for row in rows:
+        f.write(copy_line(row))
+        count += 1
+    f.write("\\.\n")
+    f.write("COMMIT;\n")
+    return count
+
+def write_rows(rows: Iterable[Sequence[Any]], f: TextIO, columns: Sequence[str], sql_format: str = "insert") -> int:
+    if sql_format == "copy":
+        return write_copy(rows, f, columns)
+    if sql_format == "insert":
+        return write_inserts(rows, f, columns)
+    raise ValueError("unknown SQL format {!r}, expected one of {}".format(sql_format, ", ".join(FORMATS)))
+
+def ends_with_newline(path: str) -> bool:
+    try:
+        with open(path, "rb") as f:
+            if f.seek(0, os.SEEK_END) == 0:
+                return True
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+    except FileNotFoundError:
+        return True
+
+def append_rows(rows: List[Sequence[Any]], path: str, columns: Sequence[str]) -> int:
+    """Append one run's rows to a .sql dump as a single INSERT transaction."""
+    if not rows:
+        return 0
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Older dumps may end without a newline; BEGIN must not run on from their last statement
+    separator = "" if ends_with_newline(path) else "\n"
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(separator)
+        return write_inserts(rows, f, columns)
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Measures how long the interface change history takes to load into a database.
+
+The rows come from changes.db, or from changes.jsonl when there is no
+database yet, or are generated with --synthetic N. Each method loads them
+into a fresh database with the interface_changes schema and indexes:
+
+- sqlite legacy: one single-row INSERT per statement, each committed on its
+  own, as replaying the old .sql dumps did (capped at --legacy-rows rows)
+- sqlite insert script: the multi-row INSERT transaction of sql_export
+- sqlite executemany: parameterized inserts, as ChangeStore writes them
+
+With psycopg2 installed and a DSN in LUMINARA_BENCH_PG_DSN (or --pg-dsn), the
+insert script and a COPY FROM STDIN stream are also loaded into a temporary
+table on that PostgreSQL server; nothing outside the session is touched.
+
+Usage: python3 sql_load_benchmark.py [--synthetic 100000] [--legacy-rows 2000] [--pg-dsn DSN]
+"""
+
+import argparse
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import time
+
+import change_log
+import change_store
+import sql_export
+
+PG_DSN_ENV_VAR = "LUMINARA_BENCH_PG_DSN"
+DEFAULT_LEGACY_ROWS = 2000
+
+PG_SCHEMA = """
+CREATE TEMP TABLE interface_changes (
+    id BIGSERIAL PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    team TEXT,
+    service TEXT,
+    field TEXT,
+    full_path TEXT,
+    change_type TEXT NOT NULL,
+    old_value TEXT,
+    new_value TEXT
+);
+CREATE INDEX ON interface_changes (team, service, field, timestamp);
+CREATE INDEX ON interface_changes (timestamp);
+"""
+
+def history_rows():
+    """Rows of the recorded history: the database if there is one, else the JSON Lines log."""
+    if os.path.exists(change_store.CHANGES_DB_PATH):
+        with change_store.ChangeStore(change_store.CHANGES_DB_PATH) as store:
+            return "changes.db", list(store.rows())
+    records = change_log.iter_changes(change_log.CHANGES_LOG_PATH, change_log.LEGACY_CHANGES_PATH)
+    return "changes.jsonl", list(change_store.log_rows(records))
+
+def synthetic_rows(count):
+    # Values include the characters each format has to escape
+    return [(
+        f"2025-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}+00:00Z",
+        f"team-{i % 50}",
+        ("rpc", "indexer", "masp")[i % 3],
+        "version",
+        f"namada.interface.{i % 500}.settings.{i % 3}.version",
+        "modified",
+        json.dumps(f"v1.{i}"),
+        json.dumps({"note": "it's\ta \"tab\"\\path", "height": i})
+    ) for i in range(count)]
+
+def fresh_sqlite(directory, name):
+    connection = sqlite3.connect(os.path.join(directory, name), isolation_level=None)
+    connection.executescript(change_store.SCHEMA)
+    return connection
+
+def timed(method, rows, load, script_bytes=None):
+    started = time.perf_counter()
+    load()
+    return {"method": method, "rows": rows, "seconds": time.perf_counter() - started, "script_bytes": script_bytes}
+
+def insert_script(rows):
+    buffer = io.StringIO()
+    sql_export.write_inserts(rows, buffer, change_store.COLUMNS)
+    return buffer.getvalue()
+
+def sqlite_results(rows, legacy_rows):
+    results = []
+    script = insert_script(rows)
+    with tempfile.TemporaryDirectory() as directory:
+        legacy = [sql_export.insert_statement([row], change_store.COLUMNS) for row in rows[:legacy_rows]]
+        connection = fresh_sqlite(directory, "legacy.db")
+        def load_legacy():
+            # Autocommit, so every statement is its own transaction
+            for statement in legacy:
+                connection.execute(statement)
+        results.append(timed("sqlite legacy", len(legacy), load_legacy, sum(len(s) for s in legacy)))
+        connection.close()
+
+        connection = fresh_sqlite(directory, "script.db")
+        results.append(timed("sqlite insert script", len(rows), lambda: connection.executescript(script), len(script)))
+        connection.close()
+
+        connection = fresh_sqlite(directory, "executemany.db")
+        insert = "INSERT INTO interface_changes ({}) VALUES ({})".format(
+            ", ".join(change_store.COLUMNS), ", ".join("?" * len(change_store.COLUMNS))
+        )
+        def load_executemany():
+            connection.execute("BEGIN")
+            connection.executemany(insert, rows)
+            connection.execute("COMMIT")
+        results.append(timed("sqlite executemany", len(rows), load_executemany))
+        connection.close()
+    return results
+
+def postgres_results(rows, dsn):
+    try:
+        import psycopg2
+    except ImportError:
+        print("Skipping PostgreSQL: psycopg2 is not installed")
+        return []
+    results = []
+    script = insert_script(rows)
+    copy_data = "".join(sql_export.copy_line(row) for row in rows)
+    copy = "COPY interface_changes ({}) FROM STDIN".format(", ".join(change_store.COLUMNS))
+    connection = psycopg2.connect(dsn)
+    # The insert script manages its own transaction
+    connection.autocommit = True
+    try:
+        with connection.cursor() as cursor:
+            for method, load, script_bytes in (
+                ("postgres insert script", lambda: cursor.execute(script), len(script)),
+                ("postgres copy", lambda: cursor.copy_expert(copy, io.StringIO(copy_data)), len(copy_data))
+            ):
+                cursor.execute("DROP TABLE IF EXISTS pg_temp.interface_changes")
+                cursor.execute(PG_SCHEMA)
+                results.append(timed(method, len(rows), load, script_bytes))
+                cursor.execute("SELECT count(*) FROM interface_changes")
+                loaded = cursor.fetchone()[0]
+                if loaded != len(rows):
+                    raise RuntimeError(f"{method} loaded {loaded} of {len(rows)} rows")
+    finally:
+        connection.close()
+    return results
+
+def print_table(results):
+    print(f"{'method':<24} {'rows':>9} {'seconds':>9} {'rows/s':>10} {'SQL MB':>8}")
+    for r in results:
+        rate = r["rows"] / r["seconds"] if r["seconds"] else 0.0
+        size = f"{r['script_bytes'] / 1024 / 1024:.1f}" if r["script_bytes"] is not None else "-"
+        print(f"{r['method']:<24} {r['rows']:>9} {r['seconds']:>9.3f} {rate:>10.0f} {size:>8}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark loading the interface change history into SQLite and PostgreSQL.")
+    parser.add_argument("--synthetic", type=int, metavar="N", help="load N generated rows instead of the recorded history")
+    parser.add_argument("--legacy-rows", type=int, default=DEFAULT_LEGACY_ROWS,
+                        help="rows loaded one statement per transaction; that method is too slow for the full history")
+    parser.add_argument("--pg-dsn", default=os.environ.get(PG_DSN_ENV_VAR),
+                        help=f"PostgreSQL connection string, defaults to ${PG_DSN_ENV_VAR}")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.synthetic:
+        source, rows = f"{args.synthetic} synthetic rows", synthetic_rows(args.synthetic)
+    else:
+        source, rows = history_rows()
+    if not rows:
+        print(f"No rows to load from {source}")
+        return
+    print(f"Loading {len(rows)} rows from {source}")
+    results = sqlite_results(rows, args.legacy_rows)
+    if args.pg_dsn:
+        results.extend(postgres_results(rows, args.pg_dsn))
+    else:
+        print(f"Skipping PostgreSQL: set {PG_DSN_ENV_VAR} or --pg-dsn to include it")
+    print_table(results)
+
+if __name__ == "__main__":
+    main()
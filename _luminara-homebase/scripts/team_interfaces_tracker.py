@@ -7,6 +7,11 @@ from datetime import datetime, timezone
 from typing import Dict, List, Any, Optional, Tuple
 from collections import defaultdict
 
+import change_log
+import change_store
+import run_report
+import sql_export
+
 # POSIX paths for GitHub Actions/Ubuntu
 BASE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 INTERFACE_STATUS_PATH = os.path.join(BASE_PATH, "interface-status.json")
@@ -14,6 +19,10 @@ STATE_PATH = os.path.join(BASE_PATH, "team_state.json")  # Separate state file f
 TEAM_DATA_PATH = os.path.join(BASE_PATH, "team-data")
 JSON_OUTPUT_PATH = os.path.join(TEAM_DATA_PATH, "json")
 SQL_OUTPUT_PATH = os.path.join(TEAM_DATA_PATH, "sql")
+CHANGES_DB_PATH = os.path.join(TEAM_DATA_PATH, "changes.db")
+
+# Also append each run's rows to team-data/sql/<team>.sql as multi-row INSERTs; team-data/changes.db is the queryable store either way
+WRITE_SQL_DUMPS = False
 
 # Set which networks to track. Example: ["namada"] or ["namada", "housefire"]
 TRACKED_NETWORKS = ["namada"]  # Only mainnet by default
@@ -23,7 +32,15 @@ IGNORED_FIELDS = {
     "latest_block_height",  # handled specially in settings
     "script_start_time",
     "script_end_time",
-    "reference_latest_block_height"
+    "reference_latest_block_height",
+    "run_stats",  # per-run diagnostics from interfaces_check.py
+    "registry",  # registry endpoint health, reported but not tracked per team
+    "timings",  # per-request latencies, different on every run
+    "n_peers",  # RPC peer count, fluctuates between runs
+    "latest_block_time",  # advances with every block
+    "avg_block_time",  # drifts slightly with every block
+    "probe_age_seconds",  # how old a scheduled probe result is, set by daemon.py
+    "seconds_behind"  # follows latest_block_height
 }
 
 def filter_networks(state: dict, networks: list) -> dict:
@@ -45,31 +62,6 @@ def save_json_file(data: dict, path: str) -> None:
     with open(path, 'w', encoding='utf-8') as f:
         json.dump(data, f, indent=4)
 
-def append_to_json_file(data: List[Dict[str, Any]], path: str) -> None:
-    """Append data to existing JSON file."""
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    
-    # Load existing data
-    try:
-        with open(path, 'r', encoding='utf-8') as f:
-            existing_data = json.load(f)
-            if not isinstance(existing_data, list):
-                existing_data = []
-    except (FileNotFoundError, json.JSONDecodeError):
-        existing_data = []
-    
-    # Append new data
-    existing_data.extend(data)
-    
-    # Save back to file
-    with open(path, 'w', encoding='utf-8') as f:
-        json.dump(existing_data, f, indent=4)
-
-def append_to_file(content: str, path: str) -> None:
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, 'a', encoding='utf-8') as f:
-        f.write(content)
-
 def get_change_info(path_parts: List[str], current_state: dict = None) -> Tuple[Optional[str], Optional[str], str]:
     team = None
     service = None
@@ -225,26 +217,10 @@ def detect_changes(old_state: dict, new_state: dict, path: List[str] = None, roo
     
     return changes
 
-def generate_sql_statement(change: dict, timestamp: str) -> str:
-    team_value = "'{}'".format(change['team']) if change['team'] else 'null'
-    service_value = "'{}'".format(change['service']) if change['service'] else 'null'
-    return (
-        "INSERT INTO interface_changes "
-        "(timestamp, team, service, field, full_path, change_type, old_value, new_value) "
-        "VALUES ('{}', {}, {}, '{}', '{}', '{}', '{}', '{}');\n"
-    ).format(
-        timestamp,
-        team_value,
-        service_value,
-        change['field'],
-        change['full_path'],
-        change['type'],
-        json.dumps(change['old_value']),
-        json.dumps(change['new_value'])
-    )
-
-def save_team_changes(team_changes: Dict[str, List[dict]], timestamp: str) -> None:
-    """Save changes to team-specific files."""
+def save_team_changes(team_changes: Dict[str, List[dict]], timestamp: str) -> List[str]:
+    """Save changes to team-specific files and the team database, and return the JSON files updated."""
+    updated_files = []
+    rows = []
     for team, changes in team_changes.items():
         if not changes:
             continue
@@ -265,37 +241,40 @@ def save_team_changes(team_changes: Dict[str, List[dict]], timestamp: str) -> No
             "changes": changes
         }
         
-        # Append to team JSON file
+        # Append to the team's pending log; change_log.py compact folds it into the JSON view
         json_path = os.path.join(JSON_OUTPUT_PATH, f"{safe_team_name}.json")
-        append_to_json_file([team_entry], json_path)
+        change_log.append_team_entries([team_entry], json_path)
+        updated_files.append(json_path)
         
-        # Generate and append SQL statements
-        sql_statements = []
-        for change in changes:
-            sql_statements.append(generate_sql_statement(change, timestamp))
+        team_rows = [change_store.change_row(change, timestamp) for change in changes]
+        rows.extend(team_rows)
         
-        sql_path = os.path.join(SQL_OUTPUT_PATH, f"{safe_team_name}.sql")
-        append_to_file("".join(sql_statements), sql_path)
+        # Append the team's rows to its SQL dump as one transaction
+        if WRITE_SQL_DUMPS:
+            sql_path = os.path.join(SQL_OUTPUT_PATH, f"{safe_team_name}.sql")
+            sql_export.append_rows(team_rows, sql_path, change_store.COLUMNS)
         
-        print(f"Updated {safe_team_name}: {len(changes)} changes, {len(sql_statements)} SQL statements")
+        print(f"Updated {safe_team_name}: {len(changes)} changes")
+    store_rows(rows)
+    return updated_files
 
-def main():
-    print("Starting team interface tracker...")
-    print("Reading from: {}".format(INTERFACE_STATUS_PATH))
-    
-    timestamp = datetime.now(timezone.utc).isoformat() + "Z"
-    current_state = load_json_file(INTERFACE_STATUS_PATH)
-    if not current_state:
-        print("Error: Could not load interface status")
+def store_rows(rows: List[tuple]) -> None:
+    """Insert one run's interface_changes rows into the team database in a single transaction."""
+    if not rows:
         return
-    
-    previous_state = load_json_file(STATE_PATH)
-    is_initial = not previous_state
+    with run_report.stage("write_change_store") as counters:
+        with change_store.ChangeStore(CHANGES_DB_PATH, legacy_dumps=SQL_OUTPUT_PATH) as store:
+            counters["rows"] = store.insert(rows)
+    print("Updated {}".format(CHANGES_DB_PATH))
 
-    # Filter networks based on TRACKED_NETWORKS
-    current_state = filter_networks(current_state, TRACKED_NETWORKS)
-    previous_state = filter_networks(previous_state, TRACKED_NETWORKS) if previous_state else previous_state
+def record_team_changes(current_state: dict, previous_state: dict, timestamp: str) -> List[str]:
+    """Append the changes between two filtered states to the per-team logs.
 
+    An empty previous_state records each team's initial state instead.
+    Returns the team JSON files that were written.
+    """
+    is_initial = not previous_state
+    updated_files = []
     if is_initial:
         print("Initial run detected - recording complete state")
         
@@ -318,6 +297,7 @@ def main():
                 team_initial_states[team].append(team_entry)
         
         # Save initial states to team files
+        rows = []
         for team, entries in team_initial_states.items():
             # Skip entries with team "-"
             if team == "-":
@@ -336,30 +316,28 @@ def main():
             }
             
             json_path = os.path.join(JSON_OUTPUT_PATH, f"{safe_team_name}.json")
-            append_to_json_file([initial_entry], json_path)
+            change_log.append_team_entries([initial_entry], json_path)
+            updated_files.append(json_path)
             
-            # Generate initial SQL statement
+            # Initial row for the team database, and optionally the SQL dump
             if entries:
-                interface_data = entries[0]["interface_data"]
-                sql_statement = (
-                    "INSERT INTO interface_changes "
-                    "(timestamp, team, service, field, full_path, change_type, old_value, new_value) "
-                    "VALUES ('{}', '{}', 'interface', 'initial_state', 'namada.operator.{}.interface', 'initial', 'null', '{}');\n"
-                ).format(
-                    timestamp,
-                    team or 'null',
-                    team or 'unknown',
-                    json.dumps(interface_data)
+                initial_row = change_store.initial_row(
+                    timestamp, entries[0]["interface_data"], team, "interface", "initial_state",
+                    f"namada.operator.{team or 'unknown'}.interface"
                 )
-                
-                sql_path = os.path.join(SQL_OUTPUT_PATH, f"{safe_team_name}.sql")
-                append_to_file(sql_statement, sql_path)
+                rows.append(initial_row)
+                if WRITE_SQL_DUMPS:
+                    sql_path = os.path.join(SQL_OUTPUT_PATH, f"{safe_team_name}.sql")
+                    sql_export.append_rows([initial_row], sql_path, change_store.COLUMNS)
             
             print(f"Initial state for {safe_team_name}: {len(entries)} entries")
         
+        store_rows(rows)
         change_count = len(team_initial_states)
     else:
-        detected_changes = detect_changes(previous_state, current_state)
+        with run_report.stage("detect_changes") as counters:
+            detected_changes = detect_changes(previous_state, current_state)
+            counters["changes"] = len(detected_changes)
         if detected_changes:
             # Group changes by team
             team_changes = defaultdict(list)
@@ -368,7 +346,9 @@ def main():
                 team_changes[team].append(change)
             
             # Save changes to team-specific files
-            save_team_changes(team_changes, timestamp)
+            with run_report.stage("write_team_files") as counters:
+                updated_files = save_team_changes(team_changes, timestamp)
+                counters["files"] = len(updated_files)
             change_count = len(detected_changes)
         else:
             change_count = 0
@@ -378,10 +358,31 @@ def main():
         print("Recorded {} changes at {}".format(change_count, timestamp))
     else:
         print("No changes detected at {}".format(timestamp))
+    return updated_files
+
+def main():
+    print("Starting team interface tracker...")
+    print("Reading from: {}".format(INTERFACE_STATUS_PATH))
     
-    save_json_file(current_state, STATE_PATH)
+    timestamp = datetime.now(timezone.utc).isoformat() + "Z"
+    with run_report.stage("load"):
+        current_state = load_json_file(INTERFACE_STATUS_PATH)
+        if not current_state:
+            print("Error: Could not load interface status")
+            return
+        
+        previous_state = load_json_file(STATE_PATH)
+
+    # Filter networks based on TRACKED_NETWORKS
+    current_state = filter_networks(current_state, TRACKED_NETWORKS)
+    previous_state = filter_networks(previous_state, TRACKED_NETWORKS) if previous_state else previous_state
+
+    run_report.count("updated_files", len(record_team_changes(current_state, previous_state, timestamp)))
+    with run_report.stage("save_state"):
+        save_json_file(current_state, STATE_PATH)
     print("Updated {}".format(STATE_PATH))
     print("Done!")
 
 if __name__ == "__main__":
-    main()
+    with run_report.run("team_interfaces_tracker"):
+        main()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Streaming of the legacy JSON array history by change_log.iter_json_array:
+whatever the read chunk size, the elements come out as json.loads reads them,
+including numbers and other scalars that a chunk boundary cuts in two.
+
+    python3 -m unittest test_change_log
+"""
+
+import io
+import json
+import unittest
+
+import change_log
+
+DOCUMENTS = [
+    "[]",
+    "[123456]",
+    "[123456, 7, 89012]",
+    " [ -12.5e3 ,0.000125,\n1E10 ] ",
+    '["a,b]", "it\'s \\"quoted\\"", "\\u00e9", ""]',
+    "[true, false, null, 42]",
+    '[{"timestamp": "2025-01-01T00:00:00Z", "changes": [{"old_value": 100, "new_value": 1000}]}, 314159]'
+]
+
+def stream(document, chunk_size):
+    return list(change_log.iter_json_array(io.StringIO(document), chunk_size))
+
+class JsonArrayChunks(unittest.TestCase):
+    def test_elements_match_json_loads(self):
+        for document in DOCUMENTS:
+            for chunk_size in range(1, 11):
+                with self.subTest(document=document, chunk_size=chunk_size):
+                    self.assertEqual(stream(document, chunk_size), json.loads(document))
+
+    def test_truncated_array(self):
+        for chunk_size in (1, 3, 64):
+            with self.subTest(chunk_size=chunk_size):
+                with self.assertRaises(ValueError):
+                    stream("[123, 456", chunk_size)
+
+if __name__ == "__main__":
+    unittest.main()
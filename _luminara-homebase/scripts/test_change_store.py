@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Round trip of the recorded team .sql dumps through change_store: every
+statement is imported as exactly one row, and exporting and importing again
+gives the same rows. Also checks that a store imports its legacy dumps only
+on the first open.
+
+    python3 -m unittest test_change_store
+"""
+
+import os
+import tempfile
+import unittest
+
+import change_store
+
+TEAM_SQL_PATH = os.path.join(change_store.BASE_PATH, "team-data", "sql")
+
+def team_dumps():
+    if not os.path.isdir(TEAM_SQL_PATH):
+        return []
+    return sorted(os.path.join(TEAM_SQL_PATH, name) for name in os.listdir(TEAM_SQL_PATH) if name.endswith(".sql"))
+
+@unittest.skipUnless(team_dumps(), "no team .sql dumps in team-data/sql")
+class TeamDumpRoundTrip(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def import_rows(self, db_name, sql_path):
+        with change_store.ChangeStore(os.path.join(self.directory.name, db_name)) as store:
+            imported, skipped = store.import_sql_file(sql_path)
+            return imported, skipped, list(store.rows())
+
+    def test_round_trip(self):
+        for sql_path in team_dumps():
+            name = os.path.basename(sql_path)
+            with self.subTest(dump=name):
+                with open(sql_path, "r", encoding="utf-8") as f:
+                    statements = f.read().count("INSERT INTO interface_changes")
+                imported, skipped, rows = self.import_rows(name + ".db", sql_path)
+                self.assertEqual((imported, skipped), (statements, 0))
+                # A statement joined onto the one before it must not end up inside its values
+                self.assertFalse([row for row in rows if any("INSERT INTO" in (value or "") for value in row)])
+
+                export_path = os.path.join(self.directory.name, name)
+                with change_store.ChangeStore(os.path.join(self.directory.name, name + ".db")) as store:
+                    self.assertEqual(change_store.export_sql(store, export_path), statements)
+                imported, skipped, exported_rows = self.import_rows(name + ".export.db", export_path)
+                self.assertEqual((imported, skipped), (statements, 0))
+                self.assertEqual(exported_rows, rows)
+
+LEGACY_STATEMENT = (
+    "INSERT INTO interface_changes (timestamp, team, service, field, full_path, change_type, old_value, new_value) "
+    "VALUES ('{}', 'team-1', 'rpc', 'version', 'namada.operator.team-1.service.rpc.version', 'modified', '\"1\"', '\"2\"');\n"
+)
+
+class LegacyDumpImport(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.db_path = os.path.join(self.directory.name, "changes.db")
+        self.dumps = os.path.join(self.directory.name, "sql")
+
+    def write_dump(self, name, timestamps):
+        os.makedirs(self.dumps, exist_ok=True)
+        with open(os.path.join(self.dumps, name), "a", encoding="utf-8") as f:
+            f.write("".join(LEGACY_STATEMENT.format(timestamp) for timestamp in timestamps))
+
+    def row_count(self):
+        with change_store.ChangeStore(self.db_path, legacy_dumps=self.dumps) as store:
+            return len(list(store.rows()))
+
+    def test_imported_on_first_open_only(self):
+        self.write_dump("a.sql", ["t1", "t2"])
+        self.write_dump("b.sql", ["t3"])
+        self.assertEqual(self.row_count(), 3)
+        # Dumps written after the store took over are not history it is missing
+        self.write_dump("a.sql", ["t4"])
+        self.write_dump("c.sql", ["t5"])
+        self.assertEqual(self.row_count(), 3)
+
+    def test_missing_dumps_are_recorded(self):
+        self.assertEqual(self.row_count(), 0)
+        self.write_dump("a.sql", ["t1"])
+        self.assertEqual(self.row_count(), 0)
+
+    def test_rebuilt_team_store_covers_dumps(self):
+        self.write_dump("a.sql", ["t1"])
+        records = [
+            {"timestamp": "t0", "type": "initial", "state": {"networks": []}},
+            {"timestamp": "t2", "changes": [
+                {"team": "team-1", "service": "rpc", "field": "version", "full_path": "p", "type": "modified", "old_value": "1", "new_value": "2"},
+                {"team": "-", "service": "rpc", "field": "version", "full_path": "p", "type": "modified", "old_value": "1", "new_value": "2"}
+            ]}
+        ]
+        self.assertEqual(change_store.rebuild_team_store(records, self.db_path, self.dumps), 2)
+        self.assertEqual(self.row_count(), 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Reference block time of interfaces_check.ReferenceHeight when the scheduler
+serves healthy endpoints from cache: their latest block time is carried
+forward by the probe age, so a freshly probed node that stalled is measured
+against it rather than only against the other fresh, stalled nodes.
+
+    python3 -m unittest test_interfaces_check
+"""
+
+import unittest
+from datetime import datetime, timedelta, UTC
+
+import interfaces_check
+
+PROBED = datetime(2025, 1, 1, 12, 0, tzinfo=UTC)
+CONFIG = {
+    "services": {
+        "rpc": {
+            "block_lag_thresholds": {"healthy": 50, "max": 150},
+            "time_lag_thresholds": {"healthy": 300, "max": 900}
+        }
+    }
+}
+
+def rpc_record(url, height, latest, age=None):
+    record = {
+        "service": "rpc",
+        "url": url,
+        "status": "up",
+        "latest_block_height": str(height),
+        "latest_block_time": latest.isoformat(),
+        "avg_block_time": 6.0
+    }
+    if age:
+        record["probe_age_seconds"] = age
+    return record
+
+class CarriedBlockTimes(unittest.TestCase):
+    def setUp(self):
+        states = {"https://lagging.example.com": "sync_lag"}
+        self.reference = interfaces_check.ReferenceHeight(
+            last_assessment=lambda key: {"sync_state": states.get(key[1], "sync_ok")}
+        )
+        # Healthy endpoints, served from a probe made two minutes ago
+        for i in range(3):
+            self.reference.add(rpc_record(f"https://healthy-{i}.example.com", 1000, PROBED, age=120))
+        # Cached too, but not healthy when probed, so its block time is not carried
+        self.reference.add(rpc_record("https://lagging.example.com", 1000, PROBED + timedelta(hours=1), age=120))
+        # Probed afresh: close in height, but their newest block is ten minutes older
+        self.stalled = [rpc_record(f"https://stalled-{i}.example.com", 995, PROBED - timedelta(minutes=10)) for i in range(2)]
+        for record in self.stalled:
+            self.reference.add(record)
+
+    def test_reference_time_carries_healthy_cached_endpoints(self):
+        ref_block, _ = self.reference.estimate()
+        self.assertEqual(ref_block, 1020)
+        self.assertEqual(self.reference.reference_time(ref_block), PROBED + timedelta(seconds=120))
+
+    def test_stalled_fresh_endpoints_are_behind(self):
+        ref_block, _ = self.reference.estimate()
+        ref_time = self.reference.reference_time(ref_block)
+        for record in self.stalled:
+            interfaces_check.assess_service(record, ref_block, CONFIG, self.reference.block_time(), ref_time)
+            self.assertEqual(record["seconds_behind"], 720)
+            self.assertEqual(record["sync_state"], "sync_lag")
+
+    def test_carried_outliers_are_left_out(self):
+        self.reference.add(rpc_record("https://forked.example.com", 5000, PROBED + timedelta(days=1), age=120))
+        ref_block, outliers = self.reference.estimate()
+        self.assertEqual([outlier["url"] for outlier in outliers], ["https://forked.example.com"])
+        self.assertEqual(self.reference.reference_time(ref_block), PROBED + timedelta(seconds=120))
+
+if __name__ == "__main__":
+    unittest.main()